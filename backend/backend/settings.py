@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,18 +47,24 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # Add CORS middleware - must be at the top
+    'myapp.metrics.RequestMetricsMiddleware',
+    'myapp.nplusone.QueryCheckMiddleware',
+    'myapp.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'myapp.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'myapp.replicas.PrimaryPinningMiddleware',
 ]
 
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # For development only - more permissive
 CORS_ALLOW_CREDENTIALS = True
+CORS_EXPOSE_HEADERS = ['Server-Timing']
 CORS_ALLOW_METHODS = [
     'DELETE',
     'GET',
@@ -99,9 +107,56 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests instead of reopening (and
+        # re-running the pragmas below) every time
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock when a transaction starts, so concurrent
+            # writers wait on busy_timeout instead of failing with
+            # "database is locked" when a read lock can't be upgraded
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Read replicas. Safe-method API requests read from one of these aliases;
+# writes, and callers who wrote in the last PRIMARY_PIN_SECONDS, use
+# 'default'. To try it locally with two SQLite files:
+#   cp db.sqlite3 replica.sqlite3
+#   DJANGO_REPLICA_DB=replica.sqlite3 python manage.py runserver
+# A Postgres replica is configured the same way, with TEST MIRROR pointing
+# at 'default' so the test suite doesn't create a second database.
+if os.environ.get('DJANGO_REPLICA_DB'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / os.environ['DJANGO_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['myapp.replicas.ReplicaRouter']
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+PRIMARY_PIN_SECONDS = 5
+
+# Applied to every new SQLite connection by myapp.sqlite.configure_connection.
+# The production profile (DJANGO_SQLITE_PROFILE=production) uses WAL, which
+# lets grade entry and page loads run concurrently. Compare the two with
+# `python manage.py sqlite_benchmark`. WAL mode is stored in the database
+# file itself, so development keeps the rollback journal: otherwise any
+# manage.py command would rewrite the checked-in db.sqlite3.
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'wal',
+    'busy_timeout': 5000,  # milliseconds
+    'synchronous': 'normal',  # safe with WAL; only the last commits can be lost on power failure
+    'cache_size': -20000,  # in KiB when negative, so ~20 MB per connection
+    'mmap_size': 134217728,  # 128 MB
+    'temp_store': 'memory',
+}
+if os.environ.get('DJANGO_SQLITE_PROFILE') == 'production':
+    SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS
+else:
+    SQLITE_PRAGMAS = {'busy_timeout': 5000}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -150,16 +205,109 @@ AUTH_USER_MODEL = 'myapp.User'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # Opaque tokens (with an in-process cache) and signed access tokens
+        'myapp.authentication.SignedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        # Same output as rest_framework.renderers.JSONRenderer, faster with orjson installed
+        'myapp.renderers.FastJSONRenderer',
+        # ?format=columnar: lists as {"columns": [...], "rows": [[...], ...]}
+        'myapp.renderers.ColumnarJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        # ?format=msgpack, when the msgpack package is installed
+        *(['myapp.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',  # Change to IsAuthenticated for production
     ],
     'EXCEPTION_HANDLER': 'rest_framework.views.exception_handler'
 }
 
+# Build unpaginated user, course and university lists from .values() rows
+# (myapp.fastrows) instead of the serializers. The output is identical.
+FAST_LIST_RESPONSES = True
+
+# Responses of at least MIN_SIZE bytes, and all streaming exports, are
+# compressed (myapp.compression): brotli when the client accepts it and the
+# brotli package is installed, gzip otherwise.
+COMPRESSION = {
+    'MIN_SIZE': 1024,
+    'BROTLI_QUALITY': 5,
+    'GZIP_LEVEL': 6,
+}
+
+# Per-request query counts and timings (myapp.metrics): a Server-Timing
+# header, a JSON line on the 'myapp.performance' logger and per-endpoint
+# histograms at /api/metrics/ (admins only, Prometheus text format)
+REQUEST_METRICS = {
+    'ENABLED': True,
+}
+
+# Report SELECTs repeated THRESHOLD or more times in one request, a sign of
+# a query per row (myapp.nplusone): a warning with the issuing stack in
+# development, and a failing request under the test runner below.
+NPLUSONE = {
+    'ENABLED': DEBUG,
+    'RAISE': False,
+    'THRESHOLD': 5,
+}
+TEST_RUNNER = 'myapp.testrunner.TestRunner'
+
+# Superusers can profile a request with "X-Profile: 1" or ?profile=1
+# (myapp.profiling). The newest KEEP profiles are kept in DIR, listed at
+# /api/profiles/.
+PROFILING = {
+    'ENABLED': True,
+    'DIR': os.environ.get('DJANGO_PROFILE_DIR', BASE_DIR / 'profiles'),
+    'KEEP': 50,
+}
+
+# In-process token cache used by CachedTokenAuthentication. Other worker
+# processes see token deletions and user changes after at most TTL seconds.
+TOKEN_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 60,
+}
+
+# Seconds a serialized university/course response stays in the response cache
+# (it is dropped earlier whenever a university, course or enrollment changes).
+# The versions deciding that are stored in the database (myapp.caching), so
+# they hold across worker processes with any cache backend; configure a
+# shared CACHES backend to also share the serialized responses.
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Password hashing for /api/login/ runs on this many threads, with at most
+# MAX_PENDING more logins waiting; beyond that logins get 503 Retry-After.
+LOGIN_HASHING = {
+    'WORKERS': 2,
+    'MAX_PENDING': 16,
+}
+
+# Token-bucket limits for login attempts, per client IP and per username.
+# The client IP is REMOTE_ADDR; behind reverse proxies, set CLIENT_IP_HEADER
+# (e.g. 'HTTP_X_FORWARDED_FOR') and TRUSTED_PROXIES to the number of proxies
+# appending to it (see myapp.throttling.client_ip).
+LOGIN_THROTTLE = {
+    'IP_PER_MINUTE': 30,
+    'IP_BURST': 30,
+    'USERNAME_PER_MINUTE': 5,
+    'USERNAME_BURST': 10,
+    'CLIENT_IP_HEADER': os.environ.get('DJANGO_CLIENT_IP_HEADER', 'REMOTE_ADDR'),
+    'TRUSTED_PROXIES': int(os.environ.get('DJANGO_TRUSTED_PROXIES', '1')),
+}
+
+# Signed, short-lived access tokens (see myapp/tokens.py). When enabled, the
+# login endpoints also return access_token/refresh_token; the opaque token
+# keeps working. Revocations are stored in the default cache, which must be
+# shared (e.g. Redis or Memcached) when running several processes or nodes.
+SIGNED_TOKENS = {
+    'ENABLED': False,
+    'ACCESS_TTL': 15 * 60,
+    'REFRESH_TTL': 7 * 24 * 60 * 60,
+}
+
 # Add logging configuration
 LOGGING = {
     'version': 1,
@@ -184,5 +332,11 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': True,
         },
+        # One JSON line per request; raise to WARNING to turn them off
+        'myapp.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
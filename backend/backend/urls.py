@@ -16,10 +16,10 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework.authtoken import views as auth_views
+from myapp.views import ObtainTokenView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('myapp.urls')),
-    path('api/api-token-auth/', auth_views.obtain_auth_token, name='api_token_auth'),
+    path('api/api-token-auth/', ObtainTokenView.as_view(), name='api_token_auth'),
 ]
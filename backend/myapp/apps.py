@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class MyappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'myapp'
+    
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        
+        from . import receivers  # noqa: F401
+        from .metrics import install_query_counter
+        from .nplusone import install_query_tracker
+        from .sqlite import configure_connection
+        
+        connection_created.connect(configure_connection, dispatch_uid='myapp.sqlite.configure_connection')
+        connection_created.connect(install_query_counter, dispatch_uid='myapp.metrics.install_query_counter')
+        connection_created.connect(install_query_tracker, dispatch_uid='myapp.nplusone.install_query_tracker')
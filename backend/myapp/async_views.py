@@ -0,0 +1,245 @@
+"""
+Native async views. Under ASGI (e.g. ``uvicorn backend.asgi:application``)
+these run on the event loop; under WSGI Django runs them in a one-off loop.
+
+Besides login, the read endpoints under /api/async/ mirror the list and
+detail responses of the users, courses and universities viewsets and
+current-user, using the async ORM. They accept the same tokens (or a
+session) and query parameters, but are not paginated or response-cached.
+"""
+import functools
+import json
+import logging
+import math
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Count, aprefetch_related_objects
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+
+from .authentication import SignedTokenAuthentication
+from .hashing import Overloaded, get_login_executor
+from .serializers import UserSerializer, UniversitySerializer, CourseSerializer
+from .throttling import check_login_throttle
+from .tokens import signed_tokens_enabled, issue_tokens
+from .views import UserViewSet, UniversityViewSet, CourseViewSet
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+
+def _request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+@csrf_exempt
+async def user_login(request):
+    """
+    Custom login view that returns user data along with token.
+    
+    Attempts are throttled per client IP and per username, and the password
+    hash runs on a small bounded thread pool: a burst of logins can use at
+    most LOGIN_HASHING['WORKERS'] cores and is turned away with 503 once the
+    queue is full, leaving the rest of the API responsive.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    
+    try:
+        data = _request_data(request)
+        if data is None:
+            return JsonResponse({'error': 'Malformed request body'}, status=400)
+        username = data.get('username')
+        password = data.get('password')
+        
+        if not username or not password:
+            return JsonResponse({'error': 'Please provide both username and password'}, status=400)
+        if not isinstance(username, str) or not isinstance(password, str):
+            return JsonResponse({'error': 'Username and password must be strings'}, status=400)
+        
+        wait = check_login_throttle(request, username)
+        if wait:
+            response = JsonResponse({'error': 'Too many login attempts, please try again later'}, status=429)
+            response['Retry-After'] = str(math.ceil(wait))
+            return response
+        
+        user = await User.objects.filter(username=username).afirst()
+        
+        executor = get_login_executor()
+        try:
+            if user is None:
+                # Hash anyway so unknown usernames take as long as wrong passwords
+                await executor.run(make_password, password)
+                valid = False
+            else:
+                valid = await executor.run(check_password, password, user.password)
+        except Overloaded:
+            response = JsonResponse({'error': 'Login service is busy, please try again'}, status=503)
+            response['Retry-After'] = '1'
+            return response
+        
+        if not valid:
+            return JsonResponse({'error': 'Invalid credentials'}, status=401)
+        
+        # Check if user is active
+        if not user.is_active:
+            return JsonResponse({'error': 'User is disabled'}, status=401)
+        
+        # Get or create token
+        token, created = await Token.objects.aget_or_create(user=user)
+        
+        # Return user data with token
+        response_data = await sync_to_async(lambda: UserSerializer(user).data)()
+        response_data['token'] = token.key
+        if signed_tokens_enabled():
+            response_data.update(issue_tokens(user))
+        
+        return JsonResponse(response_data, status=200)
+    except Exception as e:
+        logger.error(f"Error in user_login: {str(e)}")
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+# Rows fetched per query while streaming users and their prefetched enrollments
+CHUNK_SIZE = 2000
+
+
+async def _authenticate(request):
+    """The user for a token (opaque or signed) or session, or None"""
+    result = await SignedTokenAuthentication().aauthenticate(request)
+    if result is not None:
+        return result[0]
+    user = await request.auser()
+    if not user.is_authenticated:
+        return None
+    # The session user comes without its university, which the access checks read
+    return await User.objects.select_related('university').aget(pk=user.pk)
+
+
+def async_read_view(view):
+    """
+    GET-only, authenticated async view returning JSON, with the same error
+    responses as the DRF views
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+        try:
+            user = await _authenticate(request)
+            if user is None:
+                return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+            request.user = user
+            return await view(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            detail = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+            return JsonResponse(detail, status=exc.status_code, safe=False)
+        except ObjectDoesNotExist:
+            return JsonResponse({'detail': 'Not found.'}, status=404)
+        except Exception as e:
+            logger.error(f"Error in {view.__name__}: {str(e)}")
+            return JsonResponse({"error": str(e)}, status=500)
+    
+    return csrf_exempt(wrapper)
+
+
+async def _list(iterable):
+    return [item async for item in iterable]
+
+
+def _context(request):
+    """Serializer context as the DRF views pass it, for ?fields= / ?exclude="""
+    return {'request': Request(request)}
+
+
+def _users(user, context):
+    users = UserViewSet.visible_to(user)
+    # As in UserViewSet.get_queryset: skipped when coursesWithGrades is left out
+    if 'coursesWithGrades' in UserSerializer(context=context).fields:
+        users = users.prefetch_related('enrollments')
+    return users
+
+
+def _courses(user, context):
+    courses = CourseViewSet.visible_to(user)
+    # As in CourseViewSet.get_queryset: skipped when enrolled_count is left out
+    if 'enrolled_count' in CourseSerializer(context=context).fields:
+        courses = courses.annotate(enrolled_count=Count('enrollments'))
+    return courses
+
+
+@async_read_view
+async def user_list(request):
+    """Async counterpart of GET /api/users/, with the same filters"""
+    context = _context(request)
+    users = _users(request.user, context)
+    for backend in UserViewSet.filter_backends:
+        users = backend().filter_queryset(context['request'], users, UserViewSet)
+    students = await _list(users.aiterator(chunk_size=CHUNK_SIZE))
+    return JsonResponse(UserSerializer(students, many=True, context=context).data, safe=False)
+
+
+@async_read_view
+async def user_detail(request, pk):
+    """Async counterpart of GET /api/users/<pk>/"""
+    context = _context(request)
+    user = await _users(request.user, context).aget(pk=pk)
+    return JsonResponse(UserSerializer(user, context=context).data)
+
+
+@async_read_view
+async def current_user(request):
+    """Async counterpart of GET /api/current-user/"""
+    await aprefetch_related_objects([request.user], 'enrollments')
+    return JsonResponse(UserSerializer(request.user, context=_context(request)).data)
+
+
+@async_read_view
+async def course_list(request):
+    """
+    Async counterpart of GET /api/courses/: the courses and their enrollment
+    counts in one annotated query, as in the sync view
+    """
+    context = _context(request)
+    courses = _courses(request.user, context)
+    university_id = request.GET.get('university')
+    if university_id is not None:
+        courses = courses.filter(university_id=university_id)
+    course_rows = await _list(courses)
+    return JsonResponse(CourseSerializer(course_rows, many=True, context=context).data, safe=False)
+
+
+@async_read_view
+async def course_detail(request, pk):
+    """Async counterpart of GET /api/courses/<pk>/"""
+    context = _context(request)
+    course = await _courses(request.user, context).aget(pk=pk)
+    return JsonResponse(CourseSerializer(course, context=context).data)
+
+
+@async_read_view
+async def university_list(request):
+    """Async counterpart of GET /api/universities/"""
+    context = _context(request)
+    universities = await _list(UniversityViewSet.visible_to(request.user))
+    return JsonResponse(UniversitySerializer(universities, many=True, context=context).data, safe=False)
+
+
+@async_read_view
+async def university_detail(request, pk):
+    """Async counterpart of GET /api/universities/<pk>/"""
+    context = _context(request)
+    university = await UniversityViewSet.visible_to(request.user).aget(pk=pk)
+    return JsonResponse(UniversitySerializer(university, context=context).data)
@@ -0,0 +1,181 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+from . import tokens
+
+
+class TTLCache:
+    """
+    Bounded, thread-safe LRU map whose entries expire after ``ttl`` seconds.
+    
+    The caches below live in each worker process. Writes made through this
+    process invalidate them straight away via the receivers in
+    ``receivers.py``; other processes pick up changes once their entries
+    expire, so ``ttl`` bounds how long a deleted token or deactivated user
+    can keep working there.
+    """
+    def __init__(self, max_size=10000, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def delete_matching(self, predicate):
+        """Drop every entry whose value matches ``predicate``"""
+        with self._lock:
+            for key in [key for key, (value, expires) in self._entries.items() if predicate(value)]:
+                del self._entries[key]
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_options = getattr(settings, 'TOKEN_CACHE', {})
+# Token key -> Token, with the user and the user's university loaded
+token_cache = TTLCache(max_size=_options.get('MAX_SIZE', 10000), ttl=_options.get('TTL', 60))
+# User id -> User (with university), for signed tokens that carry no database key
+user_cache = TTLCache(max_size=_options.get('MAX_SIZE', 10000), ttl=_options.get('TTL', 60))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that keeps recently used tokens in ``token_cache``,
+    so authenticating a request (and reading request.user.university
+    afterwards) costs no queries while the token is cached.
+    
+    aauthenticate() is the same check for the native async views.
+    """
+    cache = token_cache
+    
+    def get_token_queryset(self):
+        return self.get_model().objects.select_related('user', 'user__university')
+    
+    def authenticate_credentials(self, key):
+        token = self.cache.get(key)
+        if token is None:
+            try:
+                token = self.get_token_queryset().get(key=key)
+            except self.get_model().DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            self.cache_token(key, token)
+        return self.token_credentials(token)
+    
+    async def aauthenticate_credentials(self, key):
+        token = self.cache.get(key)
+        if token is None:
+            try:
+                token = await self.get_token_queryset().aget(key=key)
+            except self.get_model().DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            self.cache_token(key, token)
+        return self.token_credentials(token)
+    
+    def cache_token(self, key, token):
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        self.cache.set(key, token)
+    
+    def token_credentials(self, token):
+        # Each request gets its own copy, so changes to request.user can't leak between requests
+        token = copy.deepcopy(token)
+        return (token.user, token)
+    
+    async def aauthenticate(self, request):
+        """Async counterpart of authenticate(); None when no token was sent"""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Invalid token header. Token string should not contain invalid characters.')
+        return await self.aauthenticate_credentials(key)
+
+
+class SignedTokenAuthentication(CachedTokenAuthentication):
+    """
+    Accepts the signed access tokens from ``myapp.tokens`` as well as the
+    opaque authtoken keys, both as "Authorization: Token <token>".
+    
+    Signed tokens are verified with the secret key alone; the user is read
+    from ``user_cache`` and only loaded from the database on a miss. For
+    signed tokens request.auth is the dict of verified claims.
+    """
+    def authenticate_credentials(self, key):
+        if not tokens.is_signed_token(key):
+            return super().authenticate_credentials(key)
+        
+        claims = self.verify_claims(key)
+        user = user_cache.get(claims['uid'])
+        if user is None:
+            User = get_user_model()
+            try:
+                user = User.objects.select_related('university').get(id=claims['uid'])
+            except User.DoesNotExist:
+                raise exceptions.AuthenticationFailed('User inactive or deleted.')
+            user_cache.set(user.id, user)
+        return self.user_credentials(user, claims)
+    
+    async def aauthenticate_credentials(self, key):
+        if not tokens.is_signed_token(key):
+            return await super().aauthenticate_credentials(key)
+        
+        claims = self.verify_claims(key)
+        user = user_cache.get(claims['uid'])
+        if user is None:
+            User = get_user_model()
+            try:
+                user = await User.objects.select_related('university').aget(id=claims['uid'])
+            except User.DoesNotExist:
+                raise exceptions.AuthenticationFailed('User inactive or deleted.')
+            user_cache.set(user.id, user)
+        return self.user_credentials(user, claims)
+    
+    def verify_claims(self, key):
+        if not tokens.signed_tokens_enabled():
+            raise exceptions.AuthenticationFailed('Signed tokens are disabled.')
+        try:
+            return tokens.verify_token(key, tokens.ACCESS)
+        except tokens.InvalidToken as exc:
+            raise exceptions.AuthenticationFailed(str(exc))
+    
+    def user_credentials(self, user, claims):
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        if not tokens.matches_password(user, claims):
+            raise exceptions.AuthenticationFailed('Token was issued before a password change.')
+        
+        return (copy.deepcopy(user), claims)
@@ -0,0 +1,123 @@
+"""
+Conditional GET and a shared response cache for the read-mostly catalog
+endpoints (universities and courses).
+
+Everything is keyed by a catalog version: the time of the last change to a
+university, course or enrollment, bumped by the receivers in
+``receivers.py``. Responses carry an ETag and Last-Modified derived from it,
+so an unchanged catalog costs one version lookup and a 304; on a 200 the
+serialized data is reused across requests with the same scope and
+parameters.
+
+The versions are rows of the CacheVersion table, so all worker processes
+agree on them and a bump commits (or rolls back) together with the change
+that caused it. The serialized data lives in the Django cache under keys
+that include the version; with the default per-process LocMemCache each
+worker simply builds its own copy, and a shared backend (Redis, Memcached)
+lets workers reuse each other's.
+"""
+import functools
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import CacheVersion
+
+CATALOG_VERSION_KEY = 'catalog'
+USER_VERSION_KEY = 'user:{}'
+
+
+def get_version(key):
+    version = CacheVersion.objects.filter(key=key).values_list('version', flat=True).first()
+    if version is None:
+        version = CacheVersion.objects.get_or_create(key=key, defaults={'version': time.time()})[0].version
+    return version
+
+
+def bump_versions(keys):
+    keys = set(keys)
+    now = time.time()
+    if CacheVersion.objects.filter(key__in=keys).update(version=now) < len(keys):
+        # Some keys are new; a concurrent insert is as good as ours
+        CacheVersion.objects.bulk_create([CacheVersion(key=key, version=now) for key in keys],
+                                         ignore_conflicts=True)
+
+
+def get_catalog_version():
+    return get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    bump_versions([CATALOG_VERSION_KEY])
+
+
+def get_user_version(user_id):
+    """Version of one user's own data, for responses cached per user"""
+    return get_version(USER_VERSION_KEY.format(user_id))
+
+
+def bump_user_versions(user_ids):
+    bump_versions(USER_VERSION_KEY.format(user_id) for user_id in user_ids)
+
+
+def caller_scope(user):
+    """Callers with the same scope see the same catalog data"""
+    if user.university_id is None:
+        return 'all'
+    return f'university:{user.university_id}'
+
+
+def cached_catalog_response(view_method):
+    """
+    Decorate a view's GET handler (e.g. a viewset list/retrieve) with ETag /
+    Last-Modified handling and the shared response cache. Views can define
+    get_cache_scope(request) to cache more narrowly than caller_scope().
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        version = get_catalog_version()
+        if hasattr(self, 'get_cache_scope'):
+            scope = self.get_cache_scope(request)
+        else:
+            scope = caller_scope(request.user)
+        params = '&'.join(f'{key}={value}' for key, values in sorted(request.query_params.lists())
+                          for value in sorted(values))
+        fingerprint = hashlib.md5(
+            f'{request.path}?{params}|{scope}|{version}'.encode()
+        ).hexdigest()
+        etag = '"{}"'.format(hashlib.md5(
+            f"{fingerprint}|{request.META.get('HTTP_ACCEPT', '')}".encode()
+        ).hexdigest())
+        last_modified = math.ceil(version)
+        
+        def add_headers(response):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            # Let clients keep it but always revalidate
+            response['Cache-Control'] = 'private, no-cache'
+            patch_vary_headers(response, ('Authorization', 'Accept'))
+            return response
+        
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return add_headers(not_modified)
+        
+        key = f'myapp:response:{fingerprint}'
+        data = cache.get(key)
+        if data is not None:
+            return add_headers(Response(data))
+        
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK and isinstance(response, Response):
+            cache.set(key, response.data, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+            add_headers(response)
+        return response
+    
+    return wrapper
@@ -0,0 +1,129 @@
+"""
+Response compression.
+
+CompressionMiddleware compresses responses of at least
+settings.COMPRESSION['MIN_SIZE'] bytes with brotli when the client accepts
+it and the optional brotli package is installed, and with gzip otherwise.
+Streaming responses (the CSV / NDJSON exports) are compressed chunk by
+chunk as they are sent, whatever their size, so they are never buffered in
+memory. Under ASGI that needs an async streaming_content (see
+exports.aiterate): Django reads sync streaming responses into a list there.
+"""
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional dependency: pip install brotli
+    brotli = None
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+
+def compression_settings():
+    options = {'MIN_SIZE': 1024, 'BROTLI_QUALITY': 5, 'GZIP_LEVEL': 6}
+    options.update(getattr(settings, 'COMPRESSION', {}))
+    return options
+
+
+def accepted_encodings(header):
+    """Content codings from an Accept-Encoding header, leaving out those with q=0"""
+    encodings = set()
+    for item in header.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        q = '1'
+        for param in params:
+            if param.startswith('q='):
+                q = param[2:]
+        try:
+            if float(q) > 0:
+                encodings.add(coding.lower())
+        except ValueError:
+            continue
+    return encodings
+
+
+def choose_encoding(request):
+    encodings = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if brotli is not None and 'br' in encodings:
+        return 'br'
+    if 'gzip' in encodings:
+        return 'gzip'
+    return None
+
+
+def gzip_stream(level):
+    """A single gzip stream: returns (compress(chunk), flush())"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, compressor.flush
+
+
+def brotli_stream(quality):
+    compressor = brotli.Compressor(quality=quality)
+    return compressor.process, compressor.finish
+
+
+def compress_chunks(chunks, stream):
+    compress, finish = stream
+    for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+async def acompress_chunks(chunks, stream):
+    compress, finish = stream
+    async for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware with a minimum size, brotli support and async streaming
+    responses compressed as one gzip stream rather than one per chunk.
+    """
+
+    def process_response(self, request, response):
+        options = compression_settings()
+        if response.has_header('Content-Encoding'):
+            return response
+        if not response.streaming and len(response.content) < options['MIN_SIZE']:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request)
+        if encoding is None:
+            return response
+        if encoding == 'gzip' and not (response.streaming and response.is_async):
+            # Django's gzip, which also pads the header against BREACH
+            return super().process_response(request, response)
+
+        if response.streaming:
+            if encoding == 'br':
+                stream = brotli_stream(options['BROTLI_QUALITY'])
+            else:
+                stream = gzip_stream(options['GZIP_LEVEL'])
+            if response.is_async:
+                response.streaming_content = acompress_chunks(response.streaming_content, stream)
+            else:
+                response.streaming_content = compress_chunks(response.streaming_content, stream)
+            # The compressed size isn't known until the stream ends
+            del response.headers['Content-Length']
+        else:
+            compressed = brotli.compress(response.content, quality=options['BROTLI_QUALITY'])
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # As GZipMiddleware does: the body differs from the one the ETag was made for
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
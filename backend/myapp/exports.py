@@ -0,0 +1,181 @@
+"""
+Streaming CSV / NDJSON exports.
+
+Rows are produced from chunked ``.iterator()`` querysets and written out as
+they are generated, so memory use stays flat whatever the export size and
+the first bytes go out immediately. Course names and credits are loaded one
+query per chunk for the courses not seen yet, and GPAs are computed from
+that shared map.
+
+Under ASGI the generators are wrapped in an async iterator (aiterate())
+that pulls a batch of lines at a time from a worker thread; Django would
+otherwise read a sync streaming response into a list before sending it.
+"""
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from .gpa import calculate_gpa
+from .models import Course
+
+FORMATS = ('csv', 'ndjson')
+CHUNK_SIZE = 2000
+# Lines pulled from the sync generator per trip to its thread, under ASGI
+ASYNC_BATCH_SIZE = 500
+
+
+class Echo:
+    """File-like object whose write() just returns the value, for csv.writer"""
+    def write(self, value):
+        return value
+
+
+def iter_chunks(queryset, size=CHUNK_SIZE):
+    iterator = queryset.iterator(chunk_size=size)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def next_batch(iterator, size):
+    return list(islice(iterator, size))
+
+
+async def aiterate(iterable, size=ASYNC_BATCH_SIZE):
+    """
+    Async iterator over a sync one. Batches are produced with
+    thread_sensitive sync_to_async, i.e. on the thread (and database
+    connection) the sync view ran on.
+    """
+    iterator = iter(iterable)
+    fetch = sync_to_async(next_batch, thread_sensitive=True)
+    while True:
+        batch = await fetch(iterator, size)
+        if not batch:
+            return
+        for item in batch:
+            yield item
+
+
+class CourseLookup:
+    """Names and credits of the courses referenced by an export, loaded as needed"""
+    def __init__(self):
+        self.names = {}
+        self.credits = {}
+    
+    def load(self, course_ids):
+        missing = set(course_ids) - self.credits.keys()
+        if missing:
+            for course_id, name, credits in Course.objects.filter(id__in=missing).values_list('id', 'name', 'credits'):
+                self.names[course_id] = name
+                self.credits[course_id] = credits
+
+
+def passing_status(gpa):
+    return 'Not Passing' if float(gpa) < 2.0 else 'Passing'
+
+
+def iter_students(queryset):
+    """
+    Yield one dict per user with GPA, total credits and course details.
+    ``queryset`` must prefetch 'enrollments'. Its ordering is kept; unordered
+    querysets are exported by id.
+    """
+    if not queryset.ordered:
+        queryset = queryset.order_by('id')
+    courses = CourseLookup()
+    for chunk in iter_chunks(queryset):
+        courses.load(enrollment.course_id for user in chunk for enrollment in user.enrollments.all())
+        for user in chunk:
+            enrollments = [enrollment for enrollment in user.enrollments.all() if enrollment.course_id in courses.credits]
+            yield {
+                'id': user.id,
+                'name': user.name,
+                'username': user.username,
+                'email': user.email,
+                'universityId': user.university_id,
+                'gpa': calculate_gpa(((e.course_id, e.grade) for e in enrollments), courses.credits),
+                'totalCredits': sum(courses.credits[e.course_id] for e in enrollments),
+                'courses': [{
+                    'courseId': e.course_id,
+                    'courseName': courses.names[e.course_id],
+                    'grade': e.grade,
+                    'credits': courses.credits[e.course_id],
+                } for e in enrollments],
+            }
+
+
+def iter_courses(queryset):
+    """Yield one dict per course; ``queryset`` must annotate 'enrolled_count'"""
+    for chunk in iter_chunks(queryset):
+        for course in chunk:
+            yield {
+                'id': course.id,
+                'name': course.name,
+                'credits': course.credits,
+                'professor': course.professor,
+                'type': course.type,
+                'description': course.description,
+                'university': course.university_id,
+                'studentCount': course.enrolled_count,
+            }
+
+
+STUDENT_COLUMNS = ('Student ID', 'Name', 'Email', 'GPA', 'Total Credits', 'Courses', 'Grades')
+COURSE_COLUMNS = ('Course ID', 'Name', 'Credits', 'Professor', 'Type', 'Description', 'Students Enrolled')
+REPORT_COLUMNS = ('Student Name', 'Student ID', 'Email', 'GPA', 'Passing Status', 'Courses', 'Grades')
+
+
+def student_csv_row(student):
+    return (student['username'], student['name'], student['email'], student['gpa'], student['totalCredits'],
+            ';'.join(course['courseName'] for course in student['courses']),
+            ';'.join(course['grade'] for course in student['courses']))
+
+
+def course_csv_row(course):
+    return (course['id'], course['name'], course['credits'], course['professor'] or '', course['type'],
+            course['description'] or '', course['studentCount'])
+
+
+def report_csv_row(student):
+    return (student['name'], student['username'], student['email'], student['gpa'], passing_status(student['gpa']),
+            ';'.join(course['courseName'] for course in student['courses']),
+            ';'.join(course['grade'] for course in student['courses']))
+
+
+def report_json_row(student):
+    return {**student, 'passingStatus': passing_status(student['gpa'])}
+
+
+def stream_csv(columns, rows, to_row):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(to_row(row))
+
+
+def stream_ndjson(rows, to_json=None):
+    for row in rows:
+        yield json.dumps(to_json(row) if to_json else row, default=str) + '\n'
+
+
+def export_response(request, rows, file_format, filename, columns, to_csv_row, to_json=None):
+    """Build a StreamingHttpResponse for ``rows`` in the requested format"""
+    if file_format == 'csv':
+        content = stream_csv(columns, rows, to_csv_row)
+        content_type = 'text/csv; charset=utf-8'
+    else:
+        content = stream_ndjson(rows, to_json)
+        content_type = 'application/x-ndjson; charset=utf-8'
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        content = aiterate(content)
+    
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{file_format}"'
+    return response
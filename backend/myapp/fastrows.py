@@ -0,0 +1,110 @@
+"""
+Read-only fast path for large list responses.
+
+The functions here build the same rows as ``Serializer(queryset, many=True).data``
+for the user, course and university serializers, but from ``.values()``
+with one column lookup per field instead of DRF's per-field, per-object
+machinery. Choice labels come from precomputed maps and derived fields
+(coursesWithGrades) are loaded for every row with one extra query.
+
+They take the serializer instance the view would have used, so
+?fields= / ?exclude= apply, and raise UnsupportedField for a field they
+don't know how to build; the views then fall back to the serializer.
+Enabled by settings.FAST_LIST_RESPONSES.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from rest_framework import serializers
+
+from .metrics import timed
+from .models import User, Enrollment
+
+# Model fields whose value from .values() is already what the serializer field returns
+PLAIN_FIELDS = (serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+                serializers.ChoiceField, serializers.ReadOnlyField, serializers.PrimaryKeyRelatedField)
+
+ROLE_DISPLAY = dict(User.ROLE_CHOICES)
+STATUS_DISPLAY = dict(User.STATUS_CHOICES)
+
+
+class UnsupportedField(Exception):
+    """Raised for a serializer field the fast path can't reproduce"""
+
+
+def fast_lists_enabled():
+    return getattr(settings, 'FAST_LIST_RESPONSES', True)
+
+
+def build_rows(serializer, queryset, computed=None):
+    """
+    Rows matching ``serializer.data`` for ``serializer.child`` fields.
+    ``computed`` maps field names to (columns, function(row)) for fields
+    that aren't a plain model column.
+    """
+    computed = computed or {}
+    columns = []
+    builders = []
+    for name, field in serializer.child.fields.items():
+        if field.write_only:
+            continue
+        if name in computed:
+            needed, build = computed[name]
+            columns.extend(needed)
+            builders.append((name, build))
+        elif isinstance(field, serializers.SerializerMethodField) or '.' in field.source or field.source == '*':
+            raise UnsupportedField(name)
+        elif isinstance(field, PLAIN_FIELDS):
+            columns.append(field.source)
+            builders.append((name, _plain(field.source)))
+        else:
+            columns.append(field.source)
+            builders.append((name, _represented(field)))
+
+    # Always select the primary key: with an annotated queryset, values()
+    # groups by the selected columns
+    values = list(queryset.prefetch_related(None).values('pk', *dict.fromkeys(columns)))
+    with timed('serialize'):
+        return [{name: build(row) for name, build in builders} for row in values]
+
+
+def _plain(column):
+    return lambda row: row[column]
+
+
+def _represented(field):
+    # Serializers return None for missing values without calling to_representation()
+    def build(row):
+        value = row[field.source]
+        return None if value is None else field.to_representation(value)
+    return build
+
+
+def user_rows(serializer, queryset):
+    """Rows for UserSerializer(queryset, many=True)"""
+    computed = {
+        'role_display': (['role'], lambda row: ROLE_DISPLAY.get(row['role'], row['role'])),
+        'status_display': (['status'], lambda row: STATUS_DISPLAY.get(row['status'], row['status'])),
+        'gpa': (['gpa'], lambda row: '{:.2f}'.format(row['gpa'])),
+    }
+    if 'coursesWithGrades' in serializer.child.fields:
+        enrollments = defaultdict(list)
+        rows = (Enrollment.objects.filter(student__in=queryset.order_by().values('id'))
+                .order_by('id').values_list('student_id', 'course_id', 'grade'))
+        for student_id, course_id, grade in rows:
+            enrollments[student_id].append({'courseId': course_id, 'grade': grade})
+        computed['coursesWithGrades'] = (['id'], lambda row: enrollments.get(row['id'], []))
+    return build_rows(serializer, queryset, computed)
+
+
+def course_rows(serializer, queryset):
+    """Rows for CourseSerializer(queryset, many=True), with enrolled_count annotated"""
+    return build_rows(serializer, queryset, {
+        'university_name': (['university__name'], lambda row: row['university__name']),
+        'enrolled_count': (['enrolled_count'], lambda row: row['enrolled_count']),
+    })
+
+
+def university_rows(serializer, queryset):
+    """Rows for UniversitySerializer(queryset, many=True)"""
+    return build_rows(serializer, queryset)
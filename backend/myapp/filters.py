@@ -0,0 +1,85 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+
+
+class UserFilterBackend(filters.BaseFilterBackend):
+    """
+    Filter /api/users/ by query parameters. Each parameter accepts several
+    comma-separated or repeated values, e.g. ?role=teacher,admin&university=3
+    
+    role, status   - one of User.ROLE_CHOICES / User.STATUS_CHOICES
+    university     - university id, or "none" for users without one
+    is_active      - true / false
+    gpa_min, gpa_max - inclusive bounds on the stored GPA (single values)
+    """
+    def get_values(self, request, name):
+        values = []
+        for raw in request.query_params.getlist(name):
+            values.extend(value.strip() for value in raw.split(',') if value.strip())
+        return values
+    
+    def filter_queryset(self, request, queryset, view):
+        model = queryset.model
+        
+        for name, choices in (('role', model.ROLE_CHOICES), ('status', model.STATUS_CHOICES)):
+            values = self.get_values(request, name)
+            if values:
+                unknown = set(values) - {value for value, label in choices}
+                if unknown:
+                    raise ValidationError({name: f"Unknown value(s): {', '.join(sorted(unknown))}"})
+                queryset = queryset.filter(**{f'{name}__in': values})
+        
+        universities = self.get_values(request, 'university')
+        if universities:
+            include_none = 'none' in universities
+            try:
+                university_ids = [int(value) for value in universities if value != 'none']
+            except ValueError:
+                raise ValidationError({'university': 'Expected university ids or "none".'})
+            condition = Q(university__in=university_ids)
+            if include_none:
+                condition |= Q(university__isnull=True)
+            queryset = queryset.filter(condition)
+        
+        is_active = self.get_values(request, 'is_active')
+        if is_active:
+            flags = {value.lower() for value in is_active}
+            if not flags <= {'true', 'false', '1', '0'}:
+                raise ValidationError({'is_active': 'Expected true or false.'})
+            queryset = queryset.filter(is_active__in=[flag in ('true', '1') for flag in flags])
+        
+        for name, lookup in (('gpa_min', 'gpa__gte'), ('gpa_max', 'gpa__lte')):
+            value = request.query_params.get(name)
+            if value:
+                try:
+                    bound = Decimal(value)
+                except InvalidOperation:
+                    bound = None
+                if bound is None or not bound.is_finite():
+                    raise ValidationError({name: 'Expected a number.'})
+                queryset = queryset.filter(**{lookup: bound})
+        
+        return queryset
+
+
+class UserOrderingFilter(filters.OrderingFilter):
+    """
+    ?ordering= for /api/users/, e.g. ?ordering=-gpa or ?ordering=name.
+    Ties are broken by id, in the first field's direction, so the order is
+    stable across cursor pages (?ordering=-gpa&page_size=10 is the top ten)
+    and a descending order can walk the (gpa, id) index backwards. Only
+    non-null columns: the cursor compares values and can't resume after a NULL.
+    """
+    ordering_fields = ['id', 'name', 'username', 'date_joined', 'gpa', 'total_credits']
+    
+    def get_default_ordering(self, view):
+        return ['id']
+    
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view))
+        if not any(field.lstrip('-') == 'id' for field in ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
@@ -0,0 +1,103 @@
+"""
+GPA calculation shared by the serializers, reports and exports.
+
+Callers that handle many students at once should build one credits map with
+``course_credits()`` for every course they reference and pass it to
+``calculate_gpa()``, instead of looking courses up one enrollment at a time.
+
+Each user's GPA and total credits are also stored on the User row;
+``update_student_summaries()`` recomputes them after enrollments or course
+credits change.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from .models import User, Course, Enrollment
+
+GRADE_VALUES = {
+    'A+': 4.0, 'A': 4.0, 'A-': 3.7,
+    'B+': 3.3, 'B': 3.0, 'B-': 2.7,
+    'C+': 2.3, 'C': 2.0, 'C-': 1.7,
+    'D+': 1.3, 'D': 1.0, 'D-': 0.7,
+    'F': 0.0, 'N/A': 0.0
+}
+
+
+def course_credits(course_ids):
+    """Map each of the given course ids to its credits with a single query"""
+    course_ids = set(course_ids)
+    if not course_ids:
+        return {}
+    return dict(Course.objects.filter(id__in=course_ids).values_list('id', 'credits'))
+
+
+def calculate_gpa(grades, credits_map):
+    """
+    Calculate a GPA string such as '3.57' from (course_id, grade) pairs.
+    Courses missing from ``credits_map`` (deleted courses) are skipped.
+    """
+    total_points = 0
+    total_credits = 0
+    
+    for course_id, grade in grades:
+        credits = credits_map.get(course_id)
+        if credits is None:
+            continue
+        total_points += credits * GRADE_VALUES.get(grade, 0)
+        total_credits += credits
+    
+    if total_credits > 0:
+        return '{:.2f}'.format(total_points / total_credits)
+    return '0.00'
+
+
+def student_gpa(student_id):
+    """GPA of a single student, read from the database with one query"""
+    rows = Enrollment.objects.filter(student_id=student_id).values_list('course_id', 'grade', 'course__credits')
+    credits_map = {}
+    grades = []
+    for course_id, grade, credits in rows:
+        credits_map[course_id] = credits
+        grades.append((course_id, grade))
+    return calculate_gpa(grades, credits_map)
+
+
+def update_student_summaries(student_ids=None, batch_size=1000):
+    """
+    Recompute the stored gpa and total_credits of the given users (every
+    user when None) from their enrollments, with a read and an update per
+    batch of users.
+    Returns the ids of the users whose stored values changed.
+    """
+    users = User.objects.order_by('id')
+    if student_ids is not None:
+        users = users.filter(id__in=set(student_ids))
+    # Read up front rather than iterating: SQLite doesn't isolate an open
+    # cursor from the updates below
+    rows = list(users.values_list('id', 'gpa', 'total_credits'))
+    
+    changed = []
+    for start in range(0, len(rows), batch_size):
+        changed.extend(_update_summaries(rows[start:start + batch_size]))
+    return changed
+
+
+def _update_summaries(rows):
+    grades = defaultdict(list)
+    credits_map = {}
+    enrollments = Enrollment.objects.filter(student_id__in=[user_id for user_id, gpa, total in rows])
+    for student_id, course_id, grade, credits in enrollments.values_list('student_id', 'course_id', 'grade',
+                                                                         'course__credits'):
+        credits_map[course_id] = credits
+        grades[student_id].append((course_id, grade))
+    
+    updates = []
+    for user_id, gpa, total_credits in rows:
+        new_gpa = Decimal(calculate_gpa(grades[user_id], credits_map))
+        new_total = sum(credits_map[course_id] for course_id, grade in grades[user_id])
+        if (new_gpa, new_total) != (gpa, total_credits):
+            updates.append(User(id=user_id, gpa=new_gpa, total_credits=new_total))
+    
+    # bulk_update() sends no signals, so this doesn't trigger the User receivers
+    User.objects.bulk_update(updates, ['gpa', 'total_credits'])
+    return [user.id for user in updates]
@@ -0,0 +1,124 @@
+"""
+Bulk grade entry and cohort enrollment for a single course.
+
+A sheet is validated against one prefetched roster (the referenced users and
+their existing enrollments in the course) and applied in a single transaction
+with bulk_create / bulk_update, so the number of queries doesn't depend on the
+number of rows.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .gpa import GRADE_VALUES
+from .models import User, Enrollment
+from .signals import enrollments_changed
+
+MODE_GRADES = 'grades'
+MODE_ENROLL = 'enroll'
+MODES = (MODE_GRADES, MODE_ENROLL)
+
+
+def apply_grade_sheet(course, rows, mode=MODE_GRADES, partial=False):
+    """
+    Apply ``rows`` ([{'student_id': ..., 'grade': ...}]) to ``course``.
+    
+    In "grades" mode every student must already be enrolled; in "enroll" mode
+    missing enrollments are created (grade optional). Students must belong
+    to the course's university. Unless ``partial`` is set, nothing is written
+    when any row is invalid.
+    
+    Returns a summary with created / updated / unchanged counts and per-row
+    errors, numbered from 1 like the lines of a sheet.
+    """
+    errors = []
+    parsed = {}
+    
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({'row': number, 'error': 'Expected an object with student_id and grade.'})
+            continue
+        try:
+            student_id = int(row.get('student_id'))
+        except (TypeError, ValueError):
+            errors.append({'row': number, 'error': 'student_id must be a number.'})
+            continue
+        
+        grade = row.get('grade') or ''
+        if not isinstance(grade, str):
+            errors.append({'row': number, 'student_id': student_id,
+                           'error': 'Invalid grade: expected text such as "B+".'})
+            continue
+        grade = grade.strip().upper()
+        if grade and grade not in GRADE_VALUES:
+            errors.append({'row': number, 'student_id': student_id, 'error': f'Unknown grade "{grade}".'})
+            continue
+        if not grade and mode == MODE_GRADES:
+            errors.append({'row': number, 'student_id': student_id, 'error': 'Grade is required.'})
+            continue
+        if student_id in parsed:
+            errors.append({'row': number, 'student_id': student_id,
+                           'error': f'Duplicate of row {parsed[student_id][0]}.'})
+            continue
+        parsed[student_id] = (number, grade)
+    
+    # The whole roster in two queries
+    students = {student['id']: student for student in
+                User.objects.filter(id__in=parsed).values('id', 'role', 'university_id')}
+    enrollments = {enrollment.student_id: enrollment for enrollment in
+                   Enrollment.objects.filter(course=course, student_id__in=parsed)}
+    
+    to_create = []
+    to_update = []
+    unchanged = 0
+    now = timezone.now()
+    
+    for student_id, (number, grade) in parsed.items():
+        student = students.get(student_id)
+        if student is None:
+            errors.append({'row': number, 'student_id': student_id, 'error': 'Unknown student.'})
+            continue
+        if student['role'] != 'student':
+            errors.append({'row': number, 'student_id': student_id, 'error': 'User is not a student.'})
+            continue
+        if student['university_id'] != course.university_id:
+            errors.append({'row': number, 'student_id': student_id,
+                           'error': "Student is not at this course's university."})
+            continue
+        
+        enrollment = enrollments.get(student_id)
+        if enrollment is None:
+            if mode == MODE_GRADES:
+                errors.append({'row': number, 'student_id': student_id,
+                               'error': 'Student is not enrolled in this course.'})
+                continue
+            to_create.append(Enrollment(student_id=student_id, course=course, grade=grade or 'N/A'))
+        elif grade and enrollment.grade != grade:
+            enrollment.grade = grade
+            # bulk_update() doesn't apply auto_now
+            enrollment.updated_at = now
+            to_update.append(enrollment)
+        else:
+            unchanged += 1
+    
+    errors.sort(key=lambda error: error['row'])
+    applied = partial or not errors
+    
+    if applied and (to_create or to_update):
+        with transaction.atomic():
+            Enrollment.objects.bulk_create(to_create, batch_size=500)
+            Enrollment.objects.bulk_update(to_update, ['grade', 'updated_at'], batch_size=500)
+        enrollments_changed.send(
+            sender=Enrollment,
+            student_ids=[enrollment.student_id for enrollment in [*to_create, *to_update]],
+            course_ids=[course.id],
+        )
+    
+    return {
+        'course': course.id,
+        'mode': mode,
+        'applied': applied,
+        'created': len(to_create) if applied else 0,
+        'updated': len(to_update) if applied else 0,
+        'unchanged': unchanged,
+        'errors': errors,
+    }
@@ -0,0 +1,65 @@
+"""
+Helpers for hashing passwords off the request thread.
+
+This module must not import models: process pool workers import it (to find
+the functions below) before Django is set up.
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def init_worker(settings_module):
+    """Process pool initializer: spawned workers need Django configured to hash"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def hash_password(password):
+    from django.contrib.auth.hashers import make_password
+    return make_password(password)
+
+
+class Overloaded(Exception):
+    """Raised when a BoundedExecutor's queue is full"""
+
+
+class BoundedExecutor:
+    """
+    Thread pool for password hashing with a cap on queued work.
+    
+    PBKDF2 releases the GIL, so ``max_workers`` threads use at most that many
+    cores no matter how many logins arrive; once ``max_workers + max_pending``
+    hashes are in flight further calls fail fast with Overloaded instead of
+    queueing behind them.
+    """
+    def __init__(self, max_workers=2, max_pending=16):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+    
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise Overloaded()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(fn, *args))
+        finally:
+            self._slots.release()
+
+
+_login_executor = None
+_login_executor_lock = threading.Lock()
+
+
+def get_login_executor():
+    """The process-wide executor for login hashing, sized by the LOGIN_HASHING setting"""
+    global _login_executor
+    with _login_executor_lock:
+        if _login_executor is None:
+            from django.conf import settings
+            options = getattr(settings, 'LOGIN_HASHING', {})
+            _login_executor = BoundedExecutor(max_workers=options.get('WORKERS', 2),
+                                              max_pending=options.get('MAX_PENDING', 16))
+        return _login_executor
@@ -0,0 +1,224 @@
+"""
+Bulk user import from CSV or NDJSON.
+
+Rows are read lazily from the uploaded file and handled in chunks: each chunk
+is validated against a university map loaded once up front and a single
+uniqueness query, its passwords are hashed in parallel on a process pool and
+the users are inserted with one bulk_create().
+
+CSV files need a header row; NDJSON files hold one JSON object per line.
+Recognised columns: username, email, name, password, role, status, university
+(an id or a name), is_active.
+"""
+import codecs
+import csv
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .hashing import hash_password, init_worker
+from .models import User, University
+from .reports import invalidate_university_reports
+
+FORMATS = ('csv', 'ndjson')
+
+
+def detect_format(filename, default='csv'):
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    if extension in ('ndjson', 'jsonl'):
+        return 'ndjson'
+    if extension == 'csv':
+        return 'csv'
+    return default
+
+
+def iter_rows(binary_file, file_format, encoding='utf-8'):
+    """Yield (line_number, row dict or error message) from a binary file, one row at a time"""
+    text = codecs.getreader(encoding)(binary_file)
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        try:
+            for row in reader:
+                yield reader.line_num, {key.strip(): value for key, value in row.items() if key}
+        except (csv.Error, UnicodeDecodeError) as exc:
+            yield reader.line_num, f'CSV parse error - {exc}'
+    else:
+        for number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield number, f'JSON parse error - {exc}'
+                continue
+            yield number, row if isinstance(row, dict) else 'Expected a JSON object.'
+
+
+class UserImporter:
+    """
+    Import users in chunks of ``chunk_size``.
+    
+    ``workers`` processes hash passwords (0 or 1 hashes in-process).
+    ``university`` forces every row into that university (university admins).
+    ``progress`` is called as progress(processed, created, error_count) after each chunk.
+    """
+    def __init__(self, chunk_size=500, workers=None, university=None, progress=None):
+        self.chunk_size = chunk_size
+        self.workers = getattr(settings, 'USER_IMPORT_WORKERS', os.cpu_count()) if workers is None else workers
+        self.university = university
+        self.progress = progress
+        self.processed = 0
+        self.created = 0
+        self.errors = []
+        self.roles = {value for value, label in User.ROLE_CHOICES}
+        self.statuses = {value for value, label in User.STATUS_CHOICES}
+    
+    def run(self, rows):
+        """Import the (line_number, row) pairs from ``rows`` and return a summary"""
+        self.universities_by_id = {}
+        self.universities_by_name = {}
+        for university in University.objects.only('id', 'name'):
+            self.universities_by_id[str(university.id)] = university
+            self.universities_by_name[university.name.strip().lower()] = university
+        
+        executor = None
+        if self.workers > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'backend.settings'),),
+            )
+        try:
+            chunk = []
+            for number, row in rows:
+                chunk.append((number, row))
+                if len(chunk) >= self.chunk_size:
+                    self.import_chunk(chunk, executor)
+                    chunk = []
+            if chunk:
+                self.import_chunk(chunk, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        self.errors.sort(key=lambda error: error['row'])
+        if self.created:
+            # bulk_create() doesn't send post_save
+            invalidate_university_reports()
+        
+        return {'processed': self.processed, 'created': self.created, 'errors': self.errors}
+    
+    def import_chunk(self, chunk, executor):
+        valid = []
+        seen_usernames = set()
+        seen_emails = set()
+        
+        for number, row in chunk:
+            self.processed += 1
+            try:
+                user, password = self.build_user(row)
+            except ValidationError as exc:
+                self.errors.append({'row': number, 'error': ' '.join(exc.messages)})
+                continue
+            if user.username in seen_usernames or user.email in seen_emails:
+                self.errors.append({'row': number, 'error': 'Duplicate username or email in this file.'})
+                continue
+            seen_usernames.add(user.username)
+            seen_emails.add(user.email)
+            valid.append((number, user, password))
+        
+        # One query for the uniqueness check of the whole chunk
+        taken = User.objects.filter(Q(username__in=seen_usernames) | Q(email__in=seen_emails))
+        taken_usernames = set()
+        taken_emails = set()
+        for username, email in taken.values_list('username', 'email'):
+            taken_usernames.add(username)
+            taken_emails.add(email)
+        
+        rows = []
+        for number, user, password in valid:
+            if user.username in taken_usernames:
+                self.errors.append({'row': number, 'error': f'Username "{user.username}" already exists.'})
+            elif user.email in taken_emails:
+                self.errors.append({'row': number, 'error': f'Email "{user.email}" already exists.'})
+            else:
+                rows.append((number, user, password))
+        
+        passwords = [password for number, user, password in rows]
+        if executor is not None:
+            hashes = executor.map(hash_password, passwords, chunksize=max(1, len(passwords) // (self.workers * 4)))
+        else:
+            hashes = map(hash_password, passwords)
+        for (number, user, password), hashed in zip(rows, hashes):
+            user.password = hashed
+        
+        self.save_chunk(rows)
+        
+        if self.progress:
+            self.progress(self.processed, self.created, len(self.errors))
+    
+    def save_chunk(self, rows):
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([user for number, user, password in rows])
+            self.created += len(rows)
+        except IntegrityError:
+            # Someone else took a username or email meanwhile; find the culprits row by row
+            for number, user, password in rows:
+                try:
+                    with transaction.atomic():
+                        user.save(force_insert=True)
+                    self.created += 1
+                except IntegrityError:
+                    user.pk = None
+                    self.errors.append({'row': number, 'error': 'Username or email already exists.'})
+    
+    def build_user(self, row):
+        """Validate one row and return an unsaved User and its raw password"""
+        if isinstance(row, str):
+            raise ValidationError(row)
+        
+        username = str(row.get('username') or '').strip()
+        email = str(row.get('email') or '').strip()
+        name = str(row.get('name') or '').strip()
+        if not username or not email or not name:
+            raise ValidationError('username, email and name are required.')
+        if len(username) > User._meta.get_field('username').max_length:
+            raise ValidationError('username is too long.')
+        if len(name) > User._meta.get_field('name').max_length:
+            raise ValidationError('name is too long.')
+        validate_email(email)
+        email = User.objects.normalize_email(email)
+        
+        role = str(row.get('role') or 'student').strip().lower()
+        if role not in self.roles:
+            raise ValidationError(f'Unknown role "{role}".')
+        user_status = str(row.get('status') or 'active').strip().lower()
+        if user_status not in self.statuses:
+            raise ValidationError(f'Unknown status "{user_status}".')
+        
+        is_active = row.get('is_active', True)
+        if isinstance(is_active, str):
+            is_active = is_active.strip().lower() not in ('0', 'false', 'no')
+        
+        university = self.university
+        if university is None:
+            reference = str(row.get('university') or '').strip()
+            if reference:
+                university = (self.universities_by_id.get(reference)
+                              or self.universities_by_name.get(reference.lower()))
+                if university is None:
+                    raise ValidationError(f'Unknown university "{reference}".')
+        
+        user = User(username=username, email=email, name=name, role=role, status=user_status,
+                    is_active=bool(is_active), university=university)
+        # An empty password gives the account an unusable one
+        return user, row.get('password') or None
@@ -0,0 +1,81 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from myapp.models import User, University, Course, Enrollment
+
+
+class Rollback(Exception):
+    """Raised to throw away the synthetic benchmark data"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API list endpoints against synthetic data. "
+        "Everything is created inside a transaction that is rolled back at the end, "
+        "but run it against a scratch copy of the database all the same."
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, nargs='+', default=[100, 1000, 5000],
+                            help='Number of students to generate for each run')
+        parser.add_argument('--courses-per-user', type=int, default=8)
+        parser.add_argument('--courses', type=int, default=50, help='Size of the course catalog')
+        parser.add_argument('--endpoint', default='/api/users/', help='List endpoint to request')
+        parser.add_argument('--compare-fast-lists', action='store_true',
+                            help='Measure with FAST_LIST_RESPONSES off and on')
+    
+    def handle(self, *args, **options):
+        modes = [('off', False), ('on', True)] if options['compare_fast_lists'] else [(None, None)]
+        header = f"{'users':>8} {'queries':>8} {'seconds':>9} {'rows/s':>10}"
+        self.stdout.write(f"{'fast':>5} {header}" if options['compare_fast_lists'] else header)
+        for user_count in options['users']:
+            try:
+                with transaction.atomic():
+                    self.seed(user_count, options['courses'], options['courses_per_user'])
+                    results = []
+                    for label, fast in modes:
+                        if fast is None:
+                            results.append((label, *self.measure(options['endpoint'])))
+                            continue
+                        with override_settings(FAST_LIST_RESPONSES=fast):
+                            results.append((label, *self.measure(options['endpoint'])))
+                    raise Rollback
+            except Rollback:
+                pass
+            for label, queries, seconds in results:
+                line = f"{user_count:>8} {queries:>8} {seconds:>9.3f} {user_count / seconds:>10.0f}"
+                self.stdout.write(f"{label:>5} {line}" if label else line)
+    
+    def seed(self, user_count, course_count, courses_per_user):
+        university = University.objects.create(name='Benchmark University', location='Benchmark', foundation_year=2000)
+        courses = Course.objects.bulk_create([
+            Course(name=f'Course {i}', credits=(i % 5) + 1, university=university) for i in range(course_count)
+        ])
+        # Passwords are irrelevant here and hashing them would dominate the setup time
+        students = User.objects.bulk_create([
+            User(username=f'bench{i}', email=f'bench{i}@example.com', name=f'Student {i}',
+                 password='!', role='student', university=university)
+            for i in range(user_count)
+        ], batch_size=1000)
+        grades = ['A', 'B+', 'B', 'C', 'F', 'N/A']
+        Enrollment.objects.bulk_create([
+            Enrollment(student=student, course=courses[(i + j) % course_count], grade=grades[(i + j) % len(grades)])
+            for i, student in enumerate(students)
+            for j in range(min(courses_per_user, course_count))
+        ], batch_size=1000)
+        User.objects.create_user('bench-admin@example.com', 'bench-admin', None, name='Benchmark Admin', role='admin')
+    
+    def measure(self, endpoint):
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(User.objects.get(username='bench-admin'))
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(endpoint)
+            seconds = time.perf_counter() - start
+        if response.status_code != 200:
+            self.stderr.write(f"{endpoint} returned {response.status_code}")
+        return len(queries), seconds
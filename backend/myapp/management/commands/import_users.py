@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp.importers import FORMATS, UserImporter, detect_format, iter_rows
+from myapp.models import University
+
+
+class Command(BaseCommand):
+    help = "Bulk import users from a CSV (with header row) or NDJSON file"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to import')
+        parser.add_argument('--file-format', choices=FORMATS,
+                            help='File format (guessed from the extension by default)')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Password hashing processes (defaults to the number of CPUs)')
+        parser.add_argument('--university', type=int, default=None,
+                            help='Put every imported user in this university')
+    
+    def handle(self, *args, **options):
+        university = None
+        if options['university'] is not None:
+            try:
+                university = University.objects.get(id=options['university'])
+            except University.DoesNotExist:
+                raise CommandError(f"University {options['university']} not found")
+        
+        file_format = options['file_format'] or detect_format(options['path'])
+        
+        def progress(processed, created, error_count):
+            self.stdout.write(f"{processed} rows processed, {created} users created, {error_count} errors")
+        
+        importer = UserImporter(chunk_size=options['chunk_size'], workers=options['workers'],
+                                university=university, progress=progress)
+        try:
+            with open(options['path'], 'rb') as source:
+                result = importer.run(iter_rows(source, file_format))
+        except OSError as exc:
+            raise CommandError(str(exc))
+        
+        for error in result['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['created']} of {result['processed']} users ({len(result['errors'])} errors)"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from myapp.caching import bump_catalog_version
+from myapp.gpa import update_student_summaries
+from myapp.reports import invalidate_university_reports
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the gpa and total_credits stored on every user (or the given users) "
+        "from their enrollments. Migration 0011 fills them in and the signal receivers "
+        "keep them up to date; this is for repairs, e.g. after raw SQL changes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', type=int, nargs='*', help='Only recompute these users')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        changed = update_student_summaries(options['user_ids'] or None, batch_size=options['batch_size'])
+        if changed:
+            # Cached API responses include the GPA
+            bump_catalog_version()
+            invalidate_university_reports()
+        self.stdout.write(self.style.SUCCESS(f"Updated {len(changed)} user(s)"))
@@ -0,0 +1,121 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from myapp.sqlite import apply_pragmas
+
+# Python's sqlite3 default, which is what a stock Django setup waits for a lock
+DEFAULT_TIMEOUT = 5.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure concurrent read/write throughput on SQLite with its default settings "
+        "and with settings.SQLITE_PRODUCTION_PRAGMAS. Runs against a scratch database in a temporary "
+        "directory, shaped like the enrollment table, so the real database is never touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help='Threads running report-style reads')
+        parser.add_argument('--writers', type=int, default=4, help='Threads saving grades')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run')
+        parser.add_argument('--students', type=int, default=5000)
+        parser.add_argument('--courses', type=int, default=50)
+
+    def handle(self, *args, **options):
+        profiles = [
+            ('default', {}),
+            ('production', getattr(settings, 'SQLITE_PRODUCTION_PRAGMAS', {})),
+        ]
+        self.stdout.write(f"{'profile':>12} {'reads/s':>10} {'writes/s':>10} {'locked':>8}")
+        for name, pragmas in profiles:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'benchmark.sqlite3')
+                self.seed(path, options['students'], options['courses'])
+                reads, writes, locked = self.run(path, pragmas, options)
+            seconds = options['seconds']
+            self.stdout.write(f"{name:>12} {reads / seconds:>10.0f} {writes / seconds:>10.0f} {locked:>8}")
+
+    def connect(self, path, pragmas):
+        # isolation_level=None so transactions are explicit, as Django issues them
+        conn = sqlite3.connect(path, timeout=DEFAULT_TIMEOUT, isolation_level=None, check_same_thread=False)
+        if pragmas:
+            cursor = conn.cursor()
+            apply_pragmas(cursor, pragmas)
+            cursor.close()
+        return conn
+
+    def seed(self, path, student_count, course_count):
+        conn = sqlite3.connect(path)
+        conn.executescript('''
+            CREATE TABLE enrollment (
+                id INTEGER PRIMARY KEY,
+                student_id INTEGER NOT NULL,
+                course_id INTEGER NOT NULL,
+                grade VARCHAR(5) NOT NULL,
+                UNIQUE (student_id, course_id)
+            );
+            CREATE INDEX enrollment_course_grade ON enrollment (course_id, grade);
+        ''')
+        conn.executemany(
+            'INSERT INTO enrollment (student_id, course_id, grade) VALUES (?, ?, ?)',
+            ((student, (student + offset) % course_count, 'N/A')
+             for student in range(student_count) for offset in range(min(8, course_count))),
+        )
+        conn.commit()
+        conn.close()
+
+    def run(self, path, pragmas, options):
+        deadline = time.monotonic() + options['seconds']
+        counts = {'reads': 0, 'writes': 0, 'locked': 0}
+        lock = threading.Lock()
+
+        def count(key):
+            with lock:
+                counts[key] += 1
+
+        def reader():
+            conn = self.connect(path, pragmas)
+            rng = random.Random()
+            while time.monotonic() < deadline:
+                course = rng.randrange(options['courses'])
+                try:
+                    conn.execute(
+                        'SELECT grade, COUNT(*) FROM enrollment WHERE course_id = ? GROUP BY grade', (course,)
+                    ).fetchall()
+                    count('reads')
+                except sqlite3.OperationalError:
+                    count('locked')
+            conn.close()
+
+        def writer():
+            conn = self.connect(path, pragmas)
+            rng = random.Random()
+            while time.monotonic() < deadline:
+                student = rng.randrange(options['students'])
+                try:
+                    # One grade sheet row: a short write transaction, like Django's atomic()
+                    conn.execute('BEGIN IMMEDIATE')
+                    conn.execute('UPDATE enrollment SET grade = ? WHERE student_id = ?',
+                                 (rng.choice(['A', 'B', 'C', 'F']), student))
+                    conn.execute('COMMIT')
+                    count('writes')
+                except sqlite3.OperationalError:
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                    count('locked')
+            conn.close()
+
+        threads = ([threading.Thread(target=reader) for _ in range(options['readers'])]
+                   + [threading.Thread(target=writer) for _ in range(options['writers'])])
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return counts['reads'], counts['writes'], counts['locked']
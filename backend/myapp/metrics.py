@@ -0,0 +1,275 @@
+"""
+Per-request performance accounting.
+
+RequestMetricsMiddleware tracks, for every request:
+
+- the number of SQL queries and the time spent in the database, counted by
+  an execute wrapper installed on each connection (install_query_counter is
+  connected to connection_created in MyappConfig.ready)
+- the time spent in the serializers (TimedSerializerMixin and the fast list
+  rows) and in the renderer
+- the time spent in the view, and in total
+
+It reports them in a Server-Timing header and a JSON log line on the
+'myapp.performance' logger. They are also added to per-endpoint histograms,
+which /api/metrics/ serves to admins in the Prometheus text format. The
+histograms are kept per process. With several workers, each worker serves
+its own.
+
+For streaming responses (the exports), the timings stop when the response
+starts streaming.
+"""
+import contextlib
+import contextvars
+import json
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger('myapp.performance')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_current = contextvars.ContextVar('myapp_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Counters for one request. Shared with sync_to_async threads through the contextvar."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.timings = {'db': 0.0, 'serialize': 0.0, 'render': 0.0}
+        self.view_started = None
+        self.view = None
+
+    def add(self, name, seconds):
+        self.timings[name] += seconds
+
+
+@contextlib.contextmanager
+def timed(name):
+    """Add the time spent in the block to the current request's ``name`` timing"""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(name, time.perf_counter() - started)
+
+
+def count_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.add('db', time.perf_counter() - started)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """connection_created receiver adding count_query to the connection's execute wrappers"""
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+class Histogram:
+    """A Prometheus-style histogram: cumulative bucket counts, a sum and a count"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+# name: (help, buckets)
+HISTOGRAMS = {
+    'myapp_request_duration_seconds': ('Time to produce the response', DURATION_BUCKETS),
+    'myapp_request_view_seconds': ('Time spent in the view', DURATION_BUCKETS),
+    'myapp_request_db_seconds': ('Time spent executing SQL', DURATION_BUCKETS),
+    'myapp_request_serialize_seconds': ('Time spent in serializers', DURATION_BUCKETS),
+    'myapp_request_render_seconds': ('Time spent rendering the response body', DURATION_BUCKETS),
+    'myapp_request_queries': ('SQL queries per request', QUERY_BUCKETS),
+}
+
+_lock = threading.Lock()
+# {(name, endpoint, method): Histogram}
+_histograms = {}
+
+
+def observe(endpoint, method, values):
+    with _lock:
+        for name, value in values.items():
+            key = (name, endpoint, method)
+            if key not in _histograms:
+                _histograms[key] = Histogram(HISTOGRAMS[name][1])
+            _histograms[key].observe(value)
+
+
+def reset_metrics():
+    with _lock:
+        _histograms.clear()
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus():
+    """All histograms in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        for name, (help_text, buckets) in HISTOGRAMS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for (key, endpoint, method), histogram in sorted(_histograms.items()):
+                if key != name:
+                    continue
+                labels = f'endpoint="{_label(endpoint)}",method="{_label(method)}"'
+                for bound, count in zip(buckets, histogram.counts):
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{{labels}}} {histogram.sum:g}')
+                lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+    return '\n'.join(lines) + '\n'
+
+
+def endpoint_name(request):
+    """A label with few distinct values: the URL name (e.g. 'user-list'), not the path"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route or 'unnamed'
+
+
+def metrics_enabled():
+    return getattr(settings, 'REQUEST_METRICS', {}).get('ENABLED', True)
+
+
+class RequestMetricsMiddleware:
+    """Measure each request, then add a Server-Timing header, log it and record it"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not metrics_enabled():
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not metrics_enabled():
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Called after the view returns and right before the (DRF) response is rendered
+        metrics = _current.get()
+        if metrics is not None:
+            now = time.perf_counter()
+            if metrics.view_started is not None:
+                metrics.view = now - metrics.view_started
+            response.add_post_render_callback(lambda r: metrics.add('render', time.perf_counter() - now))
+        return response
+
+    def finish(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started
+        if metrics.view is None and metrics.view_started is not None:
+            metrics.view = time.perf_counter() - metrics.view_started
+        view = metrics.view or 0.0
+        timings = metrics.timings
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timings["db"] * 1000:.1f};desc="{metrics.queries} queries"',
+            f'serialize;dur={timings["serialize"] * 1000:.1f}',
+            f'render;dur={timings["render"] * 1000:.1f}',
+            f'view;dur={view * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+        endpoint = endpoint_name(request)
+        logger.info(json.dumps({
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': endpoint,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'db_ms': round(timings['db'] * 1000, 2),
+            'serialize_ms': round(timings['serialize'] * 1000, 2),
+            'render_ms': round(timings['render'] * 1000, 2),
+            'view_ms': round(view * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }))
+        observe(endpoint, request.method, {
+            'myapp_request_duration_seconds': total,
+            'myapp_request_view_seconds': view,
+            'myapp_request_db_seconds': timings['db'],
+            'myapp_request_serialize_seconds': timings['serialize'],
+            'myapp_request_render_seconds': timings['render'],
+            'myapp_request_queries': metrics.queries,
+        })
+        return response
+
+
+class TimedSerializerMixin:
+    """
+    Count the time spent turning objects into data towards the request's
+    'serialize' timing: for a top-level serializer, or for each item of a
+    top-level many=True list. Nested serializers are part of their parent's time.
+    """
+
+    def to_representation(self, instance):
+        metrics = _current.get()
+        parent = self.parent
+        if metrics is None or (parent is not None and (parent.parent is not None
+                                                       or getattr(parent, 'child', None) is not self)):
+            return super().to_representation(instance)
+        # Called once per row, so without timed()'s overhead
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.add('serialize', time.perf_counter() - started)
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0005_user_courseswithgrades'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Enrollment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grade', models.CharField(blank=True, default='N/A', max_length=5, verbose_name='Grade')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='myapp.course', verbose_name='Course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to=settings.AUTH_USER_MODEL, verbose_name='Student')),
+            ],
+            options={
+                'verbose_name': 'Enrollment',
+                'verbose_name_plural': 'Enrollments',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['course', 'grade'], name='enrollment_course_grade_idx'), models.Index(fields=['course', 'student'], name='enrollment_course_student_idx')],
+                'constraints': [models.UniqueConstraint(fields=('student', 'course'), name='unique_enrollment')],
+            },
+        ),
+    ]
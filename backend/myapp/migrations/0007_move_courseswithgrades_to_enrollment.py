@@ -0,0 +1,62 @@
+from django.db import migrations
+
+
+def forwards(apps, schema_editor):
+    """Copy every {courseId, grade} entry of User.coursesWithGrades into Enrollment rows"""
+    User = apps.get_model('myapp', 'User')
+    Course = apps.get_model('myapp', 'Course')
+    Enrollment = apps.get_model('myapp', 'Enrollment')
+
+    course_ids = set(Course.objects.values_list('id', flat=True))
+    enrollments = []
+
+    for user_id, courses_with_grades in User.objects.values_list('id', 'coursesWithGrades').iterator():
+        if not isinstance(courses_with_grades, list):
+            continue
+
+        # Later entries win if a course is listed twice
+        grades = {}
+        for entry in courses_with_grades:
+            if not isinstance(entry, dict):
+                continue
+            try:
+                course_id = int(entry.get('courseId'))
+            except (TypeError, ValueError):
+                continue
+            # Enrollments pointing at deleted courses can't be kept
+            if course_id not in course_ids:
+                continue
+            grades[course_id] = str(entry.get('grade') or 'N/A')[:5]
+
+        enrollments.extend(
+            Enrollment(student_id=user_id, course_id=course_id, grade=grade)
+            for course_id, grade in grades.items()
+        )
+
+    Enrollment.objects.bulk_create(enrollments, batch_size=1000)
+
+
+def backwards(apps, schema_editor):
+    """Rebuild User.coursesWithGrades from the Enrollment rows"""
+    User = apps.get_model('myapp', 'User')
+    Enrollment = apps.get_model('myapp', 'Enrollment')
+
+    courses_by_user = {}
+    for student_id, course_id, grade in Enrollment.objects.order_by('id').values_list('student_id', 'course_id', 'grade'):
+        courses_by_user.setdefault(student_id, []).append({'courseId': course_id, 'grade': grade})
+
+    users = list(User.objects.filter(id__in=courses_by_user.keys()))
+    for user in users:
+        user.coursesWithGrades = courses_by_user[user.id]
+    User.objects.bulk_update(users, ['coursesWithGrades'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0006_enrollment'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:08
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0007_move_courseswithgrades_to_enrollment'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='user',
+            name='coursesWithGrades',
+        ),
+    ]
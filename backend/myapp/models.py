@@ -1,13 +1,8 @@
-from django.db import models
-from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from django.db import models, transaction
+from django.utils import timezone
 
-# Make sure we're using the right JSONField import based on Django version
-try:
-    # For Django 3.1+
-    from django.db.models import JSONField
-except ImportError:
-    # For Django 3.0 and below with postgres
-    from django.contrib.postgres.fields import JSONField
+from .signals import enrollments_changed
+from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 
 class UserManager(BaseUserManager):
     def create_user(self, email, username, password=None, **extra_fields):
@@ -49,8 +44,10 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     
-    # Make sure the JSONField is correctly initialized
-    coursesWithGrades = JSONField(default=list, blank=True, null=True)
+    # Kept up to date from the user's enrollments by myapp.gpa.update_student_summaries
+    # (see receivers.py), so users can be sorted and filtered by GPA in the database
+    gpa = models.DecimalField(max_digits=3, decimal_places=2, default=0, editable=False)
+    total_credits = models.PositiveIntegerField(default=0, editable=False)
     
     # Add the university foreign key field
     university = models.ForeignKey(
@@ -88,6 +85,16 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return f"{self.name} ({self.get_role_display()})"
     
+    class Meta:
+        indexes = [
+            # Server-side filtering of /api/users/ (e.g. the teachers of a university)
+            models.Index(fields=['university', 'role'], name='user_university_role_idx'),
+            models.Index(fields=['role', 'status'], name='user_role_status_idx'),
+            # ?ordering=-gpa and ?gpa_min=, overall and for one role
+            models.Index(fields=['gpa', 'id'], name='user_gpa_id_idx'),
+            models.Index(fields=['role', 'gpa'], name='user_role_gpa_idx'),
+        ]
+    
 class University(models.Model):
     name = models.CharField(max_length=200, verbose_name="University Name")
     location = models.CharField(max_length=200, verbose_name="Location")
@@ -105,6 +112,10 @@ class University(models.Model):
         verbose_name = "University"
         verbose_name_plural = "Universities"
         ordering = ['name']
+        indexes = [
+            # Keyset pagination walks universities by (name, id)
+            models.Index(fields=['name', 'id'], name='university_name_id_idx'),
+        ]
 
 class Course(models.Model):
     COURSE_TYPES = (
@@ -133,3 +144,99 @@ class Course(models.Model):
         verbose_name = "Course"
         verbose_name_plural = "Courses"
         ordering = ['name']
+        indexes = [
+            # Keyset pagination walks courses by (name, id), usually within one university
+            models.Index(fields=['name', 'id'], name='course_name_id_idx'),
+            models.Index(fields=['university', 'name', 'id'], name='course_university_name_id_idx'),
+        ]
+
+class EnrollmentManager(models.Manager):
+    def set_for_student(self, student, grades):
+        """
+        Make the student's enrollments match ``grades`` ({course_id: grade}),
+        touching only the rows that actually change
+        """
+        existing = {enrollment.course_id: enrollment for enrollment in self.filter(student=student)}
+        
+        to_delete = [enrollment.id for course_id, enrollment in existing.items() if course_id not in grades]
+        to_update = []
+        to_create = []
+        now = timezone.now()
+        
+        for course_id, grade in grades.items():
+            enrollment = existing.get(course_id)
+            if enrollment is None:
+                to_create.append(self.model(student=student, course_id=course_id, grade=grade))
+            elif enrollment.grade != grade:
+                enrollment.grade = grade
+                # bulk_update() doesn't apply auto_now
+                enrollment.updated_at = now
+                to_update.append(enrollment)
+        
+        with transaction.atomic(using=self.db):
+            if to_delete:
+                self.filter(id__in=to_delete).delete()
+            if to_update:
+                self.bulk_update(to_update, ['grade', 'updated_at'])
+            if to_create:
+                self.bulk_create(to_create)
+        
+        if to_delete or to_update or to_create:
+            # The bulk operations above don't send post_save/post_delete
+            enrollments_changed.send(
+                sender=self.model,
+                student_ids=[student.id],
+                course_ids=[*existing, *grades],
+            )
+
+class Enrollment(models.Model):
+    """
+    A student's enrollment in a course, together with the grade received.
+    Replaces the old User.coursesWithGrades JSON list so enrollments can be
+    queried (and indexed) per course as well as per student.
+    """
+    student = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='enrollments',
+        verbose_name="Student"
+    )
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='enrollments',
+        verbose_name="Course"
+    )
+    grade = models.CharField(max_length=5, default='N/A', blank=True, verbose_name="Grade")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = EnrollmentManager()
+    
+    def __str__(self):
+        return f"{self.student_id} in {self.course_id} ({self.grade})"
+    
+    class Meta:
+        verbose_name = "Enrollment"
+        verbose_name_plural = "Enrollments"
+        ordering = ['id']
+        constraints = [
+            # Also serves the "all courses of student X" lookups
+            models.UniqueConstraint(fields=['student', 'course'], name='unique_enrollment'),
+        ]
+        indexes = [
+            # "Who is enrolled in course X" and per-course grade distributions
+            models.Index(fields=['course', 'grade'], name='enrollment_course_grade_idx'),
+            models.Index(fields=['course', 'student'], name='enrollment_course_student_idx'),
+        ]
+
+class CacheVersion(models.Model):
+    """
+    Version stamps for the cached API responses (see caching.py). Stored in
+    the database rather than the cache so every worker process sees the
+    same version, and a change commits together with its stamp.
+    """
+    key = models.CharField(max_length=100, primary_key=True)
+    version = models.FloatField()
+    
+    def __str__(self):
+        return f"{self.key} @ {self.version}"
@@ -0,0 +1,183 @@
+"""
+N+1 query detection.
+
+While a request is handled, QueryCheckMiddleware counts every SELECT by
+its SQL text. The parameters aren't part of it, and "IN (%s, %s, ...)"
+lists of any length count as the same statement. A statement that runs
+settings.NPLUSONE['THRESHOLD'] times or more in one request is nearly
+always a query issued per row, from a serializer field, a property or a
+permission check. The report shows the Python stack that issued it.
+
+- In development (NPLUSONE['ENABLED'], on when DEBUG is) reports are
+  logged as warnings on the 'myapp.nplusone' logger.
+- Under the test runner (myapp.testrunner.TestRunner), NPLUSONE['RAISE']
+  is on, so the request fails with RepeatedQueriesError.
+
+Queries run while a streaming response is sent (the exports, which read
+in chunks on purpose) are not counted.
+
+detect_repeated_queries() applies the same check to a block of code
+outside a request, and allow_repeated_queries() exempts a block where
+repeating a statement is intended.
+"""
+import contextlib
+import contextvars
+import logging
+import os
+import re
+import traceback
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger('myapp.nplusone')
+
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+# Middleware and instrumentation frames that are on every stack
+IGNORED_MODULES = ('manage.py', 'myapp/nplusone.py', 'myapp/metrics.py', 'myapp/profiling.py',
+                   'myapp/replicas.py', 'myapp/compression.py')
+
+_tracker = contextvars.ContextVar('myapp_query_tracker', default=None)
+
+
+class RepeatedQueriesError(AssertionError):
+    """A statement ran at least NPLUSONE['THRESHOLD'] times in one request"""
+
+
+def nplusone_settings():
+    options = {'ENABLED': settings.DEBUG, 'RAISE': False, 'THRESHOLD': 5}
+    options.update(getattr(settings, 'NPLUSONE', {}))
+    return options
+
+
+def fingerprint(sql):
+    return IN_LIST.sub('IN (...)', sql)
+
+
+def caller_stack():
+    """The project's frames on the stack, leaving out the framework and the middleware"""
+    base_dir = str(settings.BASE_DIR)
+    ignored = tuple(os.path.join(base_dir, *name.split('/')) for name in IGNORED_MODULES)
+    frames = [frame for frame in traceback.extract_stack()
+              if frame.filename.startswith(base_dir) and not frame.filename.startswith(ignored)
+              and os.sep + 'site-packages' + os.sep not in frame.filename]
+    return ''.join(traceback.format_list(frames))
+
+
+class QueryTracker:
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = {}
+        # fingerprint: stack of the call that reached the threshold
+        self.stacks = {}
+        self.paused = 0
+
+    def record(self, sql):
+        if self.paused or not sql.lstrip()[:6].upper() == 'SELECT':
+            return
+        key = fingerprint(sql)
+        count = self.counts.get(key, 0) + 1
+        self.counts[key] = count
+        if count == self.threshold:
+            self.stacks[key] = caller_stack()
+
+    def repeated(self):
+        """[(count, sql, stack)] of the statements at or above the threshold, most repeated first"""
+        return sorted(((self.counts[key], key, stack) for key, stack in self.stacks.items()), reverse=True)
+
+    def report(self, label):
+        repeated = self.repeated()
+        if not repeated:
+            return None
+        parts = [f'{label}: repeated queries (N+1?)']
+        for count, sql, stack in repeated:
+            parts.append(f'\n{count} x {sql}\nIssued from:\n{stack}')
+        return ''.join(parts)
+
+
+def track_query(execute, sql, params, many, context):
+    tracker = _tracker.get()
+    if tracker is not None:
+        tracker.record(sql)
+    return execute(sql, params, many, context)
+
+
+def install_query_tracker(sender, connection, **kwargs):
+    """connection_created receiver adding track_query to the connection's execute wrappers"""
+    if track_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(track_query)
+
+
+def check(tracker, label):
+    message = tracker.report(label)
+    if message is None:
+        return
+    if nplusone_settings()['RAISE']:
+        raise RepeatedQueriesError(message)
+    logger.warning(message)
+
+
+@contextlib.contextmanager
+def detect_repeated_queries(label='block', threshold=None):
+    """Check the queries run inside the block, as the middleware does for a request"""
+    tracker = QueryTracker(threshold or nplusone_settings()['THRESHOLD'])
+    token = _tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _tracker.reset(token)
+    check(tracker, label)
+
+
+@contextlib.contextmanager
+def allow_repeated_queries():
+    """Don't count the queries run inside the block"""
+    tracker = _tracker.get()
+    if tracker is not None:
+        tracker.paused += 1
+    try:
+        yield
+    finally:
+        if tracker is not None:
+            tracker.paused -= 1
+
+
+class QueryCheckMiddleware:
+    """Report statements repeated within a request"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        options = nplusone_settings()
+        if not options['ENABLED']:
+            return self.get_response(request)
+        tracker = QueryTracker(options['THRESHOLD'])
+        token = _tracker.set(tracker)
+        try:
+            response = self.get_response(request)
+        finally:
+            _tracker.reset(token)
+        check(tracker, f'{request.method} {request.path}')
+        return response
+
+    async def __acall__(self, request):
+        options = nplusone_settings()
+        if not options['ENABLED']:
+            return await self.get_response(request)
+        tracker = QueryTracker(options['THRESHOLD'])
+        token = _tracker.set(tracker)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _tracker.reset(token)
+        check(tracker, f'{request.method} {request.path}')
+        return response
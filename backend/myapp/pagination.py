@@ -0,0 +1,173 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.response import Response
+
+
+class OptionalCursorPagination(CursorPagination):
+    """
+    Keyset (cursor) pagination that is only used when the client asks for it
+    with ?cursor= or ?page_size=, so existing callers keep getting plain lists.
+    
+    The ordering always ends with id, and the cursor holds the values of every
+    ordering field of the row it stops at, e.g. (name, id). Pages are fetched
+    with WHERE (name, id) > (<name>, <id>) LIMIT n, so with an index on the
+    ordering the thousandth page costs the same as the first, however many
+    rows share a name. (DRF's CursorPagination keeps only the first field and
+    skips ties with an offset, which scans the whole run of equal values.)
+    ?count=exact adds an exact total, ?count=estimated a cheap approximate one.
+    """
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    count_query_param = 'count'
+    # How long an estimated count may be reused before it's recomputed
+    estimated_count_timeout = 60
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        if (self.cursor_query_param not in request.query_params
+                and self.page_size_query_param not in request.query_params):
+            return None
+        
+        count_mode = request.query_params.get(self.count_query_param)
+        if count_mode == 'exact':
+            self.count = queryset.count()
+        elif count_mode == 'estimated':
+            self.count = self.get_estimated_count(queryset)
+        else:
+            self.count = None
+        
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor.position if self.cursor is not None else None
+        
+        ordering = [self.reverse_field(field) for field in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+        
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+    
+    def get_ordering(self, request, queryset, view):
+        """The requested ordering, made unique with id in the first field's direction"""
+        ordering = list(super().get_ordering(request, queryset, view))
+        if not any(field.lstrip('-') == 'id' for field in ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return tuple(ordering)
+    
+    @staticmethod
+    def reverse_field(field):
+        return field[1:] if field.startswith('-') else '-' + field
+    
+    def after(self, ordering, position):
+        """Rows after ``position`` in ``ordering``, as a row-value comparison"""
+        field, *rest = ordering
+        name = field.lstrip('-')
+        direction = 'lt' if field.startswith('-') else 'gt'
+        value, *rest_values = position
+        if not rest:
+            return Q(**{f'{name}__{direction}': value})
+        # "name >= v AND (name > v OR (name = v AND ...))": the first
+        # condition gives the index a starting point
+        return Q(**{f'{name}__{direction}e': value}) & (
+            Q(**{f'{name}__{direction}': value}) | Q(**{name: value}) & self.after(rest, rest_values))
+    
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor._replace(position=position)
+    
+    def encode_cursor(self, cursor):
+        if cursor.position is not None:
+            cursor = cursor._replace(position=json.dumps(cursor.position))
+        return super().encode_cursor(cursor)
+    
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            values.append(value if value is None or isinstance(value, (int, str)) else str(value))
+        return values
+    
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = (self._get_position_from_instance(self.page[-1], self.ordering) if self.page
+                    else self.cursor.position)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+    
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = (self._get_position_from_instance(self.page[0], self.ordering) if self.page
+                    else self.cursor.position)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+    
+    def get_estimated_count(self, queryset):
+        """
+        Use the planner statistics on PostgreSQL for unfiltered tables, and
+        otherwise an exact count that is cached for a short while
+        """
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                               [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] >= 0:
+                return row[0]
+        
+        key = 'myapp:estimated-count:' + hashlib.md5(str(queryset.query).encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.estimated_count_timeout)
+        return count
+    
+    def get_paginated_response(self, data):
+        response_data = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        }
+        if self.count is not None:
+            response_data['count'] = self.count
+        response_data['results'] = data
+        return Response(response_data)
+    
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count'] = {'type': 'integer', 'example': 123}
+        return response_schema
+
+
+class NameCursorPagination(OptionalCursorPagination):
+    """Cursor pagination for models listed alphabetically; id breaks ties"""
+    ordering = ('name', 'id')
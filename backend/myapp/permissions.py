@@ -1,5 +1,18 @@
 from rest_framework import permissions
 
+class IsAdminRole(permissions.BasePermission):
+    """Only users with the admin role (or Django superusers)"""
+    
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and (user.role == 'admin' or user.is_superuser))
+
+class IsSuperuser(permissions.BasePermission):
+    """Only Django superusers"""
+    
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and request.user.is_superuser)
+
 class IsHeadAdminOrUniversityAdmin(permissions.BasePermission):
     """
     Custom permission to only allow:
@@ -16,17 +29,17 @@ class IsHeadAdminOrUniversityAdmin(permissions.BasePermission):
         return request.user and request.user.is_authenticated
         
     def has_object_permission(self, request, view, obj):
+        # Compare the university_id columns: reading .university would load
+        # the university from the database on every check
         # Head admin can do anything
-        if request.user.is_authenticated and request.user.university is None:
+        if request.user.is_authenticated and request.user.university_id is None:
             return True
             
         # Check if user is admin for this university
-        if hasattr(obj, 'university'):
+        if hasattr(obj, 'university_id'):
             return (request.user.is_authenticated and 
-                    request.user.university and 
-                    request.user.university.id == obj.university.id)
+                    request.user.university_id == obj.university_id)
         
         # For University model
         return (request.user.is_authenticated and 
-                request.user.university and 
-                request.user.university.id == obj.id)
+                request.user.university_id == obj.id)
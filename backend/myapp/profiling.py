@@ -0,0 +1,199 @@
+"""
+On-demand request profiling.
+
+A superuser can profile a single request by sending "X-Profile: 1" or
+adding ?profile=1. ProfilingMiddleware runs that request under cProfile
+and saves the stats to settings.PROFILING['DIR']. Only the newest
+PROFILING['KEEP'] profiles are kept there. The response carries the
+profile's id in a Profile-Id header.
+
+Open a saved profile with ``python -m pstats <file>``, snakeviz or any
+other pstats viewer. The profile list is at /api/profiles/ and each file
+at /api/profiles/<id>/. Both are for superusers only.
+
+Requests without the flag only pay for a header and query-string check.
+Only one request is profiled at a time. While one is being profiled,
+other profile requests run normally and get "Profile-Id: busy".
+
+Under ASGI, async views are profiled on the event-loop thread, so the
+profile also includes whatever else the loop ran in the meantime. It does
+not include ORM calls made in sync_to_async threads.
+"""
+import cProfile
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from rest_framework import exceptions
+
+from .authentication import SignedTokenAuthentication
+
+PROFILE_ID = re.compile(r'^[0-9]{13}-[0-9a-f]{8}$')
+
+# cProfile can only run one profiler at a time
+_lock = threading.Lock()
+
+
+def profiling_settings():
+    options = {
+        'ENABLED': True,
+        'DIR': os.path.join(tempfile.gettempdir(), 'myapp-profiles'),
+        'KEEP': 50,
+    }
+    options.update(getattr(settings, 'PROFILING', {}))
+    return options
+
+
+def wants_profile(request):
+    """The cheap check run on every request: is the profile flag there at all?"""
+    if request.META.get('HTTP_X_PROFILE', '') not in ('', '0'):
+        return True
+    return 'profile=' in request.META.get('QUERY_STRING', '') and request.GET.get('profile', '0') != '0'
+
+
+def token_user(request):
+    try:
+        result = SignedTokenAuthentication().authenticate(request)
+    except exceptions.AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+async def atoken_user(request):
+    try:
+        result = await SignedTokenAuthentication().aauthenticate(request)
+    except exceptions.AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+def is_superuser(user):
+    return bool(user is not None and user.is_authenticated and user.is_superuser)
+
+
+def profile_path(profile_id, extension):
+    return os.path.join(profiling_settings()['DIR'], f'{profile_id}.{extension}')
+
+
+def save_profile(profiler, request, response, duration, user):
+    """Write the stats and a metadata file, then drop the oldest profiles beyond KEEP"""
+    options = profiling_settings()
+    os.makedirs(options['DIR'], exist_ok=True)
+    profile_id = f'{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}'
+    metadata = {
+        'id': profile_id,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': response.status_code,
+        'duration_ms': round(duration * 1000, 2),
+        'user': user.username,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+    # Written under temporary names first, so the listing never sees half a profile
+    stats_path = profile_path(profile_id, 'prof')
+    profiler.dump_stats(stats_path + '.tmp')
+    os.replace(stats_path + '.tmp', stats_path)
+    with open(profile_path(profile_id, 'json.tmp'), 'w') as f:
+        json.dump(metadata, f)
+    os.replace(profile_path(profile_id, 'json.tmp'), profile_path(profile_id, 'json'))
+
+    for old in list_profiles()[options['KEEP']:]:
+        delete_profile(old['id'])
+    return profile_id
+
+
+def list_profiles():
+    """Metadata of the saved profiles, newest first"""
+    directory = profiling_settings()['DIR']
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for name in sorted(names, reverse=True):
+        if not name.endswith('.json') or not PROFILE_ID.match(name[:-len('.json')]):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            # Removed by another process in the meantime
+            continue
+    return profiles
+
+
+def delete_profile(profile_id):
+    for extension in ('json', 'prof'):
+        try:
+            os.remove(profile_path(profile_id, extension))
+        except FileNotFoundError:
+            pass
+
+
+class ProfilingMiddleware:
+    """Profile requests from superusers that ask for it. Must come after AuthenticationMiddleware."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not (profiling_settings()['ENABLED'] and wants_profile(request)):
+            return self.get_response(request)
+        user = token_user(request) or request.user
+        if not is_superuser(user):
+            return self.get_response(request)
+        if not _lock.acquire(blocking=False):
+            return self.busy(self.get_response(request))
+        try:
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        finally:
+            _lock.release()
+        return self.finish(profiler, request, response, time.perf_counter() - started, user)
+
+    async def __acall__(self, request):
+        if not (profiling_settings()['ENABLED'] and wants_profile(request)):
+            return await self.get_response(request)
+        user = await atoken_user(request) or await request.auser()
+        if not is_superuser(user):
+            return await self.get_response(request)
+        if not _lock.acquire(blocking=False):
+            return self.busy(await self.get_response(request))
+        try:
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                response = await self.get_response(request)
+            finally:
+                profiler.disable()
+        finally:
+            _lock.release()
+        duration = time.perf_counter() - started
+        return await sync_to_async(self.finish)(profiler, request, response, duration, user)
+
+    def busy(self, response):
+        response['Profile-Id'] = 'busy'
+        return response
+
+    def finish(self, profiler, request, response, duration, user):
+        response['Profile-Id'] = save_profile(profiler, request, response, duration, user)
+        return response
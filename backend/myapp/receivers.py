@@ -0,0 +1,104 @@
+"""
+Signal receivers keeping cached data in line with the database.
+Connected in MyappConfig.ready().
+"""
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache, user_cache
+from .caching import bump_catalog_version, bump_user_versions
+from .gpa import update_student_summaries
+from .models import User, University, Course, Enrollment
+from .reports import invalidate_university_reports
+from .signals import enrollments_changed
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+def enrollment_changed(sender, instance, origin=None, **kwargs):
+    # A deleted course (or university) takes its enrollments with it one row
+    # at a time; the Course receivers below handle each course as a whole
+    if isinstance(origin, (Course, University)):
+        return
+    enrollments_changed.send(sender=Enrollment, student_ids=[instance.student_id], course_ids=[instance.course_id])
+
+
+@receiver(enrollments_changed)
+def invalidate_reports_for_enrollments(sender, student_ids, course_ids, **kwargs):
+    invalidate_university_reports()
+
+
+@receiver([post_save, post_delete], sender=Course)
+def invalidate_reports_for_course(sender, instance, **kwargs):
+    invalidate_university_reports()
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_reports_for_user(sender, instance, update_fields=None, **kwargs):
+    # Logging in only touches last_login, which no report uses
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_university_reports()
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    token_cache.delete(instance.key)
+
+
+def forget_cached_users(user_ids):
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    token_cache.delete_matching(lambda token: token.user_id in user_ids)
+    for user_id in user_ids:
+        user_cache.delete(user_id)
+    bump_user_versions(user_ids)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_tokens_for_user(sender, instance, **kwargs):
+    # Covers password, status and is_active changes as well as deletion
+    forget_cached_users([instance.id])
+
+
+@receiver([post_save, post_delete], sender=University)
+def invalidate_cached_tokens_for_university(sender, instance, **kwargs):
+    token_cache.delete_matching(lambda token: token.user.university_id == instance.id)
+    user_cache.delete_matching(lambda user: user.university_id == instance.id)
+
+
+@receiver([post_save, post_delete], sender=University)
+@receiver([post_save, post_delete], sender=Course)
+def invalidate_catalog_for_change(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(enrollments_changed)
+def invalidate_catalog_for_enrollments(sender, **kwargs):
+    # Course responses include enrolled_count
+    bump_catalog_version()
+
+
+@receiver(enrollments_changed)
+def update_gpa_for_enrollments(sender, student_ids, **kwargs):
+    # The stored values are written with bulk_update(), which skips the User receivers
+    forget_cached_users(update_student_summaries(student_ids))
+
+
+@receiver(post_save, sender=Course)
+def update_gpa_for_course_credits(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and 'credits' not in update_fields):
+        return
+    student_ids = Enrollment.objects.filter(course=instance).values_list('student_id', flat=True)
+    forget_cached_users(update_student_summaries(student_ids))
+
+
+@receiver(pre_delete, sender=Course)
+def remember_students_of_deleted_course(sender, instance, **kwargs):
+    instance._enrolled_student_ids = list(Enrollment.objects.filter(course=instance).values_list('student_id', flat=True))
+
+
+@receiver(post_delete, sender=Course)
+def update_gpa_for_deleted_course(sender, instance, **kwargs):
+    forget_cached_users(update_student_summaries(getattr(instance, '_enrolled_student_ids', [])))
@@ -0,0 +1,81 @@
+try:
+    import orjson
+except ImportError:  # optional dependency: pip install orjson
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional dependency: pip install msgpack
+    msgpack = None
+
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed, producing
+    the same bytes as JSONRenderer for the data this API returns (strings,
+    numbers, booleans, None, lists and dicts, with dates, decimals and other
+    types converted by DRF's encoder). Pretty-printed responses, non-default
+    JSON settings and anything orjson can't encode go through JSONRenderer.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=JSONEncoder().default,
+                               option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # As JSONRenderer does, so the output is a strict javascript subset
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+def to_columnar(data):
+    """
+    {"columns": [...], "rows": [[...], ...]} for a list of dicts with the
+    same keys, also inside a paginated {"results": [...]} response. Anything
+    else is returned unchanged.
+    """
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        return {**data, 'results': to_columnar(data['results'])}
+    if not isinstance(data, list) or not data or not all(isinstance(row, dict) for row in data):
+        return data
+    columns = list(data[0])
+    # Same keys in the same order, so every row lines up with the columns
+    if any(list(row) != columns for row in data):
+        return data
+    return {'columns': columns, 'rows': [list(row.values()) for row in data]}
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    """
+    Compact JSON for list endpoints: the column names once, then each row as
+    an array. Requested with ?format=columnar or
+    "Accept: application/vnd.columnar+json"; other responses render as
+    plain JSON.
+    """
+    media_type = 'application/vnd.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(to_columnar(data), accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack, requested with ?format=msgpack or "Accept: application/msgpack".
+    Needs the optional msgpack package; settings only offers it when installed.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Dates, decimals and the like become the same values as in the JSON responses
+        return msgpack.packb(data, default=JSONEncoder().default, use_bin_type=True)
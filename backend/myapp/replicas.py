@@ -0,0 +1,115 @@
+"""
+Read-replica routing.
+
+ReplicaRouter sends reads to one of settings.REPLICA_DATABASES while
+serving a safe-method (GET/HEAD/OPTIONS) request, and everything else to
+the primary ('default'). PrimaryPinningMiddleware marks those requests.
+
+Read-your-writes: once anything in a request is routed for writing, the
+rest of that request reads from the primary, and so do requests carrying
+the same credentials (Authorization header or session) for the next
+settings.PRIMARY_PIN_SECONDS. The pin is kept in the Django cache, so use
+a shared cache backend when running more than one process.
+
+Code running outside a request (management commands, tests, the shell)
+always uses the primary.
+"""
+import contextvars
+import hashlib
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_KEY = 'myapp:pin-primary:{}'
+
+# Per-request routing state: {'replica': bool, 'wrote': bool}. A dict
+# rather than plain values so that changes made inside sync_to_async
+# threads are seen by the middleware.
+_state = contextvars.ContextVar('myapp_replica_state', default=None)
+
+
+def replica_aliases():
+    return list(getattr(settings, 'REPLICA_DATABASES', []))
+
+
+class ReplicaRouter:
+    """Route reads to a replica during safe requests, and writes to the primary"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        replicas = replica_aliases()
+        if state is None or not state['replica'] or state['wrote'] or not replicas:
+            return 'default'
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            # Read our own writes for the rest of the request
+            state['wrote'] = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        databases = {'default', *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        if db in replica_aliases():
+            return False
+        return None
+
+
+def pin_key(request):
+    """Cache key identifying the caller by their credentials"""
+    credentials = (request.META.get('HTTP_AUTHORIZATION')
+                   or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+                   or request.META.get('REMOTE_ADDR', ''))
+    return PIN_KEY.format(hashlib.md5(credentials.encode()).hexdigest())
+
+
+def start_request(request):
+    """Set up routing state for a request, returning the context token"""
+    use_replica = bool(replica_aliases()) and request.method in SAFE_METHODS
+    if use_replica and cache.get(pin_key(request)):
+        use_replica = False
+    return _state.set({'replica': use_replica, 'wrote': False})
+
+
+def finish_request(request, token):
+    state = _state.get()
+    _state.reset(token)
+    if state['wrote'] and replica_aliases():
+        cache.set(pin_key(request), True, getattr(settings, 'PRIMARY_PIN_SECONDS', 5))
+
+
+def PrimaryPinningMiddleware(get_response):
+    """Mark safe requests as replica-readable, and pin callers to the primary after writes"""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = start_request(request)
+            try:
+                return await get_response(request)
+            finally:
+                finish_request(request, token)
+
+        return markcoroutinefunction(middleware)
+
+    def middleware(request):
+        token = start_request(request)
+        try:
+            return get_response(request)
+        finally:
+            finish_request(request, token)
+
+    return middleware
+
+
+PrimaryPinningMiddleware.sync_capable = True
+PrimaryPinningMiddleware.async_capable = True
@@ -0,0 +1,115 @@
+"""
+Academic reports computed in the database and cached per university.
+
+Cached reports are keyed by a version that the receivers in ``receivers.py``
+bump whenever enrollments, grades, courses or users change. A student's GPA
+depends on courses of other universities too, so every report is dropped at
+once rather than tracking which universities a change touched. The version
+is a CacheVersion row (see caching.py), so a bump made by one worker process
+is seen by all of them.
+"""
+from django.core.cache import cache
+from django.db.models import Avg, Case, Count, F, FloatField, Sum, Value, When
+from django.utils import timezone
+
+from .caching import bump_versions, get_version
+from .gpa import GRADE_VALUES
+from .models import User, Course, Enrollment
+
+REPORT_CACHE_TIMEOUT = 60 * 10
+REPORT_VERSION_KEY = 'university-report'
+
+
+def grade_points(field='grade'):
+    """SQL expression mapping a letter grade to its grade points"""
+    return Case(
+        *[When(**{field: grade}, then=Value(points)) for grade, points in GRADE_VALUES.items()],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def report_cache_key(university_id):
+    return f'myapp:university-report:{university_id}:{get_version(REPORT_VERSION_KEY)}'
+
+
+def invalidate_university_reports():
+    bump_versions([REPORT_VERSION_KEY])
+
+
+def get_university_report(university):
+    """Return the cached report for the university, building it on a miss"""
+    key = report_cache_key(university.id)
+    report = cache.get(key)
+    if report is None:
+        report = build_university_report(university)
+        cache.set(key, report, REPORT_CACHE_TIMEOUT)
+    return report
+
+
+def build_university_report(university):
+    """Aggregate per-course and per-university statistics with three queries"""
+    courses = list(
+        Course.objects.filter(university=university)
+        .order_by('name', 'id')
+        .values('id', 'name', 'credits', 'type', 'professor')
+    )
+    course_stats = {course['id']: {
+        **course,
+        'enrolled_count': 0,
+        'credits_enrolled': 0,
+        'average_grade_points': None,
+        'grade_distribution': {},
+    } for course in courses}
+    
+    grade_counts = (
+        Enrollment.objects.filter(course__university=university)
+        .values('course_id', 'grade')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    grade_distribution = {}
+    for row in grade_counts:
+        stats = course_stats[row['course_id']]
+        stats['enrolled_count'] += row['count']
+        stats['grade_distribution'][row['grade']] = row['count']
+        grade_distribution[row['grade']] = grade_distribution.get(row['grade'], 0) + row['count']
+    
+    for stats in course_stats.values():
+        stats['credits_enrolled'] = stats['credits'] * stats['enrolled_count']
+        # Ungraded ('N/A') enrollments don't count towards the course average
+        graded = {grade: count for grade, count in stats['grade_distribution'].items()
+                  if grade in GRADE_VALUES and grade != 'N/A'}
+        if graded:
+            points = sum(GRADE_VALUES[grade] * count for grade, count in graded.items())
+            stats['average_grade_points'] = '{:.2f}'.format(points / sum(graded.values()))
+    
+    # Students with no enrollments count with a GPA of 0.00, as in the user list
+    student_stats = (
+        User.objects.filter(university=university, role='student')
+        .annotate(
+            points=Sum(F('enrollments__course__credits') * grade_points('enrollments__grade')),
+            credits=Sum('enrollments__course__credits'),
+        )
+        .aggregate(
+            student_count=Count('id'),
+            average_gpa=Avg(Case(
+                When(credits__gt=0, then=F('points') / F('credits')),
+                default=Value(0.0),
+                output_field=FloatField(),
+            )),
+            total_credits=Sum('credits'),
+        )
+    )
+    
+    return {
+        'university': {'id': university.id, 'name': university.name},
+        'student_count': student_stats['student_count'],
+        'average_gpa': '{:.2f}'.format(student_stats['average_gpa'] or 0),
+        'total_credits_enrolled': student_stats['total_credits'] or 0,
+        'total_credits_offered': sum(course['credits'] for course in courses),
+        'enrollment_count': sum(stats['enrolled_count'] for stats in course_stats.values()),
+        'grade_distribution': grade_distribution,
+        'courses': list(course_stats.values()),
+        'generated_at': timezone.now().isoformat(),
+    }
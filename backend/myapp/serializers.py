@@ -1,27 +1,124 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import University, Course
+from .models import University, Course, Enrollment
+from .metrics import TimedSerializerMixin
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Lets GET requests pick the fields of the response with ?fields=id,name or
+    drop some with ?exclude=coursesWithGrades (comma-separated or repeated).
+    Unwanted fields are removed before serialization, so their method
+    fields are never called; views can also check ``fields`` to skip the
+    prefetches and annotations that only those fields need.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return
+        
+        fields = self.get_param_values(request, 'fields')
+        exclude = self.get_param_values(request, 'exclude')
+        unknown = (fields | exclude) - set(self.fields)
+        if unknown:
+            raise serializers.ValidationError({'fields': f"Unknown field(s): {', '.join(sorted(unknown))}"})
+        
+        for name in list(self.fields):
+            if (fields and name not in fields) or name in exclude:
+                self.fields.pop(name)
+    
+    @staticmethod
+    def get_param_values(request, name):
+        return {value.strip() for raw in request.query_params.getlist(name)
+                for value in raw.split(',') if value.strip()}
+
+class CoursesWithGradesField(serializers.Field):
+    """
+    Exposes a student's Enrollment rows in the legacy coursesWithGrades shape:
+    [{"courseId": 1, "grade": "A"}, ...]
+    """
+    default_error_messages = {
+        'not_a_list': 'Expected a list of {{courseId, grade}} objects but got "{input_type}".',
+        'invalid_item': 'Each entry must be an object with a numeric "courseId".',
+        'invalid_grade': 'Grade "{grade}" is too long.',
+    }
+    
+    def to_representation(self, value):
+        return [{'courseId': enrollment.course_id, 'grade': enrollment.grade} for enrollment in value.all()]
+    
+    def to_internal_value(self, data):
+        """Return an ordered {course_id: grade} dict, later entries winning on duplicates"""
+        if data is None:
+            return {}
+        if not isinstance(data, list):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        
+        grades = {}
+        for item in data:
+            if not isinstance(item, dict):
+                self.fail('invalid_item')
+            try:
+                course_id = int(item.get('courseId'))
+            except (TypeError, ValueError):
+                self.fail('invalid_item')
+            grade = str(item.get('grade') or 'N/A')
+            if len(grade) > Enrollment._meta.get_field('grade').max_length:
+                self.fail('invalid_grade', grade=grade)
+            grades[course_id] = grade
+        return grades
+
+class UserSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False, style={'input_type': 'password'})
     role_display = serializers.SerializerMethodField()
     status_display = serializers.SerializerMethodField()
-    university_id = serializers.IntegerField(source='university.id', read_only=True, required=False, allow_null=True)
+    university_id = serializers.IntegerField(read_only=True, required=False, allow_null=True)
     # Add a writable field for university
     university = serializers.PrimaryKeyRelatedField(queryset=University.objects.all(), required=False, allow_null=True)
+    coursesWithGrades = CoursesWithGradesField(source='enrollments', required=False, allow_null=True)
     gpa = serializers.SerializerMethodField()
     
     class Meta:
         model = User
         fields = ['id', 'name', 'username', 'email', 'password', 
                   'role', 'role_display', 'status', 'status_display', 
-                  'date_joined', 'is_active', 'university_id', 'university', 'coursesWithGrades', 'gpa']
+                  'date_joined', 'is_active', 'university_id', 'university', 'coursesWithGrades', 'gpa',
+                  'total_credits']
+        read_only_fields = ['total_credits']
         extra_kwargs = {
             'password': {'write_only': True},
         }
     
+    def validate_coursesWithGrades(self, value):
+        """Make sure every referenced course exists"""
+        missing = set(value) - set(Course.objects.filter(id__in=value).values_list('id', flat=True))
+        if missing:
+            raise serializers.ValidationError(
+                f"Unknown course id(s): {', '.join(str(course_id) for course_id in sorted(missing))}")
+        return value
+    
+    def create(self, validated_data):
+        has_grades = 'enrollments' in validated_data
+        grades = validated_data.pop('enrollments', None) or {}
+        user = super().create(validated_data)
+        if has_grades:
+            Enrollment.objects.set_for_student(user, grades)
+            user.refresh_from_db(fields=['gpa', 'total_credits'])
+        return user
+    
+    def update(self, instance, validated_data):
+        has_grades = 'enrollments' in validated_data
+        grades = validated_data.pop('enrollments', None) or {}
+        user = super().update(instance, validated_data)
+        if has_grades:
+            Enrollment.objects.set_for_student(user, grades)
+            # Drop any prefetched enrollments so the response shows the new ones,
+            # and pick up the GPA the enrollment receivers stored
+            getattr(user, '_prefetched_objects_cache', {}).pop('enrollments', None)
+            user.refresh_from_db(fields=['gpa', 'total_credits'])
+        return user
+    
     def get_role_display(self, obj):
         """Safely get role display name"""
         try:
@@ -37,49 +134,24 @@ class UserSerializer(serializers.ModelSerializer):
             return obj.status
 
     def get_gpa(self, obj):
-        """Calculate GPA from coursesWithGrades"""
-        try:
-            courses_with_grades = obj.coursesWithGrades or []
-            
-            if not courses_with_grades:
-                return '0.00'
-                
-            grade_values = {
-                'A+': 4.0, 'A': 4.0, 'A-': 3.7,
-                'B+': 3.3, 'B': 3.0, 'B-': 2.7,
-                'C+': 2.3, 'C': 2.0, 'C-': 1.7,
-                'D+': 1.3, 'D': 1.0, 'D-': 0.7,
-                'F': 0.0, 'N/A': 0.0
-            }
-            
-            total_points = 0
-            total_credits = 0
-            
-            for enrollment in courses_with_grades:
-                course_id = enrollment.get('courseId')
-                grade = enrollment.get('grade', 'N/A')
-                
-                try:
-                    course = Course.objects.get(id=course_id)
-                    credits = course.credits
-                    grade_value = grade_values.get(grade, 0)
-                    
-                    total_points += credits * grade_value
-                    total_credits += credits
-                except:
-                    # Skip if course doesn't exist
-                    pass
-            
-            if total_credits > 0:
-                return '{:.2f}'.format(total_points / total_credits)
-            else:
-                return '0.00'
-                
-        except Exception as e:
-            # If any error in calculation, default to 0
-            return '0.00'
+        """The GPA stored on the user, in the '3.57' string format"""
+        return '{:.2f}'.format(obj.gpa)
 
-class UniversitySerializer(serializers.ModelSerializer):
+class EnrollmentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """A single enrollment, in the same camelCase shape as coursesWithGrades entries"""
+    studentId = serializers.IntegerField(source='student_id', read_only=True)
+    courseId = serializers.IntegerField(source='course_id', read_only=True)
+    grade = serializers.CharField(max_length=5, required=False, allow_blank=True, allow_null=True)
+    
+    class Meta:
+        model = Enrollment
+        fields = ['studentId', 'courseId', 'grade', 'updated_at']
+        read_only_fields = ['updated_at']
+    
+    def validate_grade(self, value):
+        return value or 'N/A'
+
+class UniversitySerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     # Custom field for website with more flexible validation
     website = serializers.URLField(required=False, allow_blank=True, allow_null=True)
     
@@ -101,7 +173,7 @@ class UniversitySerializer(serializers.ModelSerializer):
             
         return value
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     university_name = serializers.ReadOnlyField(source='university.name')
     enrolled_count = serializers.SerializerMethodField()
 
@@ -111,16 +183,9 @@ class CourseSerializer(serializers.ModelSerializer):
                   'university', 'university_name', 'enrolled_count']
     
     def get_enrolled_count(self, obj):
-        """Calculate the number of students enrolled in this course"""
-        enrolled_count = 0
-        try:
-            # Query all users who have this course in their coursesWithGrades
-            users = User.objects.all()
-            for user in users:
-                if hasattr(user, 'coursesWithGrades'):
-                    courses = getattr(user, 'coursesWithGrades', [])
-                    if courses and any(c.get('courseId') == obj.id for c in courses):
-                        enrolled_count += 1
-        except:
-            pass
-        return enrolled_count
+        """Number of students enrolled in this course"""
+        # CourseViewSet annotates the count for the whole page in one grouped query
+        enrolled_count = getattr(obj, 'enrolled_count', None)
+        if enrolled_count is not None:
+            return enrolled_count
+        return obj.enrollments.count()
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent after bulk enrollment writes that bypass post_save/post_delete.
+# Receivers get ``student_ids`` and ``course_ids`` keyword arguments.
+enrollments_changed = Signal()
@@ -0,0 +1,37 @@
+"""
+Per-connection setup for running on SQLite in production.
+
+configure_connection() is connected to connection_created in
+MyappConfig.ready and applies settings.SQLITE_PRAGMAS to every new SQLite
+connection. SQLITE_PRAGMAS only enables WAL under the production profile
+(DJANGO_SQLITE_PROFILE=production, see settings.SQLITE_PRODUCTION_PRAGMAS).
+With WAL journaling, readers no longer wait for writers (and
+vice versa); busy_timeout makes writers queue for the write lock instead
+of failing straight away with "database is locked".
+
+See the sqlite_benchmark management command for a before/after comparison.
+"""
+from django.conf import settings
+
+# Applied in this order: journal_mode first, since it decides how the
+# others behave
+PRAGMA_ORDER = ['journal_mode', 'busy_timeout', 'synchronous', 'cache_size', 'mmap_size', 'temp_store']
+
+
+def apply_pragmas(cursor, pragmas):
+    """Run PRAGMA statements for the given {name: value} mapping"""
+    names = sorted(pragmas, key=lambda name: PRAGMA_ORDER.index(name) if name in PRAGMA_ORDER else len(PRAGMA_ORDER))
+    for name in names:
+        # Values come from settings, and PRAGMA doesn't accept parameters
+        cursor.execute(f'PRAGMA {name} = {pragmas[name]}')
+
+
+def configure_connection(sender, connection, **kwargs):
+    """connection_created receiver applying settings.SQLITE_PRAGMAS"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, pragmas)
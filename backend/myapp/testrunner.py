@@ -0,0 +1,37 @@
+import logging
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    The default runner, with N+1 query detection (myapp.nplusone) turned
+    on and failing the request that repeats a statement. The threshold is
+    lower than in development since test data has only a few rows.
+
+    The per-request lines of the 'myapp.performance' logger are silenced;
+    tests that check them use assertLogs, which lowers the level again.
+    """
+    nplusone_threshold = 3
+    quiet_loggers = ['myapp.performance']
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.saved_nplusone = getattr(settings, 'NPLUSONE', None)
+        settings.NPLUSONE = {**(self.saved_nplusone or {}), 'ENABLED': True, 'RAISE': True,
+                             'THRESHOLD': self.nplusone_threshold}
+        self.saved_levels = {}
+        for name in self.quiet_loggers:
+            logger = logging.getLogger(name)
+            self.saved_levels[name] = logger.level
+            logger.setLevel(logging.WARNING)
+
+    def teardown_test_environment(self, **kwargs):
+        for name, level in self.saved_levels.items():
+            logging.getLogger(name).setLevel(level)
+        if self.saved_nplusone is None:
+            del settings.NPLUSONE
+        else:
+            settings.NPLUSONE = self.saved_nplusone
+        super().teardown_test_environment(**kwargs)
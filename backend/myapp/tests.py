@@ -1,3 +1,1137 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import pstats
+import re
+import tempfile
+import unittest
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, F
+from django.db.migrations.executor import MigrationExecutor
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from .authentication import token_cache, user_cache
+from .compression import CompressionMiddleware, accepted_encodings
+from .metrics import reset_metrics
+from .nplusone import QueryCheckMiddleware, RepeatedQueriesError, allow_repeated_queries, detect_repeated_queries
+from .permissions import IsHeadAdminOrUniversityAdmin
+from .serializers import CourseSerializer
+from .hashing import BoundedExecutor, Overloaded
+from .throttling import client_ip, ip_limiter, username_limiter
+from .models import User, University, Course, Enrollment, CacheVersion
+from .renderers import msgpack
+from .replicas import PrimaryPinningMiddleware, ReplicaRouter
+
+
+class EnrollmentAPITests(APITestCase):
+    def setUp(self):
+        self.university = University.objects.create(name='Test University', location='Tashkent', foundation_year=1990)
+        self.math = Course.objects.create(name='Math', credits=4, university=self.university)
+        self.physics = Course.objects.create(name='Physics', credits=3, university=self.university)
+        self.admin = User.objects.create_user('admin@example.com', 'admin', 'secret', name='Admin', role='admin')
+        self.student = User.objects.create_user('student@example.com', 'student', 'secret', name='Student',
+                                                university=self.university)
+        self.client.force_authenticate(self.admin)
+
+    def test_patch_courses_with_grades_writes_enrollments(self):
+        response = self.client.patch(f'/api/users/{self.student.id}/', {
+            'coursesWithGrades': [
+                {'courseId': self.math.id, 'grade': 'A'},
+                {'courseId': self.physics.id, 'grade': 'B'},
+            ]
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['coursesWithGrades'], [
+            {'courseId': self.math.id, 'grade': 'A'},
+            {'courseId': self.physics.id, 'grade': 'B'},
+        ])
+        self.assertEqual(response.data['gpa'], '3.57')
+        self.assertEqual(Enrollment.objects.filter(course=self.math).count(), 1)
+
+        # Dropping a course from the list unenrolls the student
+        response = self.client.patch(f'/api/users/{self.student.id}/', {
+            'coursesWithGrades': [{'courseId': self.physics.id, 'grade': 'C'}]
+        }, format='json')
+        self.assertEqual(response.data['coursesWithGrades'], [{'courseId': self.physics.id, 'grade': 'C'}])
+        self.assertFalse(Enrollment.objects.filter(course=self.math).exists())
+
+    def test_single_enrollment_endpoint(self):
+        url = f'/api/users/{self.student.id}/enrollments/{self.math.id}/'
+        response = self.client.put(url, {'grade': 'B'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['courseId'], response.data['grade'], response.data['gpa']),
+                         (self.math.id, 'B', '3.00'))
+
+        Enrollment.objects.create(student=self.student, course=self.physics, grade='A')
+        response = self.client.put(url, {'grade': 'A'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['gpa'], '4.00')
+        # The other enrollment is left alone
+        self.assertEqual(Enrollment.objects.get(student=self.student, course=self.physics).grade, 'A')
+
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.delete(url).status_code, 404)
+        self.assertEqual(self.client.put(f'/api/users/{self.student.id}/enrollments/999999/', {}).status_code, 404)
+
+    def test_single_enrollment_endpoint_permissions(self):
+        url = f'/api/users/{self.student.id}/enrollments/{self.math.id}/'
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.put(url, {'grade': 'A'}, format='json').status_code, 403)
+        self.assertEqual(self.client.delete(url).status_code, 403)
+
+        other = University.objects.create(name='Other University', location='Samarkand', foundation_year=2000)
+        art = Course.objects.create(name='Art', credits=2, university=other)
+        teacher = User.objects.create(username='t', email='t@example.com', name='T', role='teacher',
+                                      university=self.university)
+        self.client.force_authenticate(teacher)
+        response = self.client.put(f'/api/users/{self.student.id}/enrollments/{art.id}/', {'grade': 'A'},
+                                   format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Enrollment.objects.filter(course=art).exists())
+        self.assertEqual(self.client.put(url, {'grade': 'A'}, format='json').status_code, 201)
+
+    def test_unknown_course_is_rejected(self):
+        response = self.client.patch(f'/api/users/{self.student.id}/', {
+            'coursesWithGrades': [{'courseId': 999999, 'grade': 'A'}]
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('coursesWithGrades', response.data)
+
+
+class UserListQueryCountTests(APITestCase):
+    def setUp(self):
+        self.university = University.objects.create(name='Test University', location='Tashkent', foundation_year=1990)
+        self.courses = [Course.objects.create(name=f'Course {i}', credits=i + 1, university=self.university)
+                        for i in range(4)]
+        self.admin = User.objects.create_user('admin@example.com', 'admin', 'secret', name='Admin', role='admin')
+        self.client.force_authenticate(self.admin)
+
+    def add_students(self, count):
+        for i in range(count):
+            student = User.objects.create(username=f'student{User.objects.count()}',
+                                          email=f'student{User.objects.count()}@example.com',
+                                          name='Student', university=self.university)
+            for course in self.courses:
+                Enrollment.objects.create(student=student, course=course, grade='B')
+
+    def test_list_query_count_does_not_grow_with_users(self):
+        self.add_students(2)
+        with CaptureQueriesContext(connection) as few:
+            response = self.client.get('/api/users/')
+        self.assertEqual(response.status_code, 200)
+
+        self.add_students(20)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/api/users/')
+        self.assertEqual(len(response.data), 23)
+        self.assertEqual(len(few), len(many))
+        self.assertEqual({user['gpa'] for user in response.data if user['role'] == 'student'}, {'3.00'})
+
+
+class CourseListTests(APITestCase):
+    def test_enrolled_count_is_annotated_for_the_page(self):
+        university = University.objects.create(name='Test University', location='Tashkent', foundation_year=1990)
+        courses = [Course.objects.create(name=f'Course {i}', credits=3, university=university) for i in range(5)]
+        for i in range(6):
+            student = User.objects.create(username=f's{i}', email=f's{i}@example.com', name='S')
+            for course in courses[:i]:
+                Enrollment.objects.create(student=student, course=course)
+        self.client.force_authenticate(User.objects.create_user('a@example.com', 'admin', 'secret', name='A'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/courses/')
+        self.assertEqual([course['enrolled_count'] for course in response.data], [5, 4, 3, 2, 1])
+        # The catalog version, then the courses
+        self.assertEqual(len(queries), 2)
+
+
+class CursorPaginationTests(APITestCase):
+    def setUp(self):
+        for i in range(7):
+            University.objects.create(name=f'University {i}', location='L', foundation_year=2000)
+        self.client.force_authenticate(User.objects.create_user('a@example.com', 'admin', 'secret', name='A'))
+
+    def test_unpaginated_by_default(self):
+        response = self.client.get('/api/universities/')
+        self.assertEqual(len(response.data), 7)
+
+    def test_walks_all_pages_in_order(self):
+        names = []
+        response = self.client.get('/api/universities/?page_size=3&count=exact')
+        self.assertEqual(response.data['count'], 7)
+        while True:
+            names.extend(university['name'] for university in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(names, [f'University {i}' for i in range(7)])
+
+    def walk(self, url, key):
+        """Every page forwards, then backwards from the last one, checking neither needs an OFFSET"""
+        pages = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertFalse(any('OFFSET' in query['sql'] for query in queries))
+            pages.append([row[key] for row in response.data['results']])
+            url, previous = response.data['next'], response.data['previous']
+        backwards = [pages[-1]]
+        while previous:
+            response = self.client.get(previous)
+            backwards.append([row[key] for row in response.data['results']])
+            previous = response.data['previous']
+        self.assertEqual(backwards[::-1], pages)
+        return [value for page in pages for value in page]
+
+    def test_ties_are_paged_by_id(self):
+        university = University.objects.get(name='University 0')
+        courses = [Course.objects.create(name=name, credits=3, university=university).id
+                   for name in ['Math'] * 5 + ['Art', 'Math', 'Zoology']]
+        ids = self.walk('/api/courses/?page_size=2', 'id')
+        self.assertEqual(ids, [courses[5], *courses[:5], courses[6], courses[7]])
+
+        students = [User.objects.create(username=f's{i}', email=f's{i}@example.com', name='S').id
+                    for i in range(5)]
+        admin = User.objects.get(username='admin').id
+        # Everyone at 0.00: the id breaks the tie, in the same direction
+        self.assertEqual(self.walk('/api/users/?ordering=-gpa&page_size=2', 'id'), sorted([admin, *students],
+                                                                                         reverse=True))
+        self.assertEqual(self.walk('/api/users/?ordering=date_joined&page_size=2', 'id'), [admin, *students])
+
+    def test_page_size_is_capped_and_bad_cursor_is_404(self):
+        response = self.client.get('/api/users/?page_size=100000&count=estimated')
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(self.client.get('/api/users/?cursor=garbage').status_code, 404)
+
+
+class UniversityReportTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.university = University.objects.create(name='Test University', location='Tashkent', foundation_year=1990)
+        self.math = Course.objects.create(name='Math', credits=4, university=self.university)
+        self.physics = Course.objects.create(name='Physics', credits=2, university=self.university)
+        self.alice = User.objects.create(username='alice', email='alice@example.com', name='Alice',
+                                         university=self.university)
+        self.bob = User.objects.create(username='bob', email='bob@example.com', name='Bob',
+                                       university=self.university)
+        User.objects.create(username='carol', email='carol@example.com', name='Carol', university=self.university)
+        Enrollment.objects.create(student=self.alice, course=self.math, grade='A')
+        Enrollment.objects.create(student=self.alice, course=self.physics, grade='C')
+        Enrollment.objects.create(student=self.bob, course=self.math, grade='N/A')
+        self.client.force_authenticate(User.objects.create_user('a@example.com', 'admin', 'secret', name='A'))
+
+    def test_report_aggregates(self):
+        report = self.client.get(f'/api/universities/{self.university.id}/report/').data
+
+        self.assertEqual(report['student_count'], 3)
+        # Alice 3.33, Bob 0.00, Carol (no courses) 0.00
+        self.assertEqual(report['average_gpa'], '1.11')
+        self.assertEqual(report['total_credits_enrolled'], 10)
+        self.assertEqual(report['total_credits_offered'], 6)
+        self.assertEqual(report['grade_distribution'], {'A': 1, 'C': 1, 'N/A': 1})
+        math = report['courses'][0]
+        self.assertEqual((math['name'], math['enrolled_count'], math['credits_enrolled']), ('Math', 2, 8))
+        self.assertEqual(math['average_grade_points'], '4.00')
+
+    def test_report_is_cached_until_grades_change(self):
+        url = f'/api/universities/{self.university.id}/report/'
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        # The university lookup and the report version
+        self.assertEqual(len(queries), 2)
+
+        self.client.patch(f'/api/users/{self.bob.id}/', {
+            'coursesWithGrades': [{'courseId': self.math.id, 'grade': 'B'}]
+        }, format='json')
+        report = self.client.get(url).data
+        self.assertEqual(report['courses'][0]['grade_distribution'], {'A': 1, 'B': 1})
+
+    def test_report_version_is_shared_between_processes(self):
+        url = f'/api/universities/{self.university.id}/report/'
+        self.client.get(url)
+        # Another worker's grade change: the row changes, this process's cache doesn't hear about it
+        Enrollment.objects.filter(student=self.bob).update(grade='B')
+        CacheVersion.objects.filter(key='university-report').update(version=F('version') + 60)
+        report = self.client.get(url).data
+        self.assertEqual(report['courses'][0]['grade_distribution'], {'A': 1, 'B': 1})
+
+
+class GradeSheetTests(APITestCase):
+    def setUp(self):
+        self.university = University.objects.create(name='Test University', location='Tashkent', foundation_year=1990)
+        self.course = Course.objects.create(name='Math', credits=4, university=self.university)
+        self.students = [User.objects.create(username=f's{i}', email=f's{i}@example.com', name=f'S{i}',
+                                             university=self.university)
+                         for i in range(30)]
+        self.client.force_authenticate(User.objects.create_user('a@example.com', 'admin', 'secret', name='A',
+                                                                role='admin'))
+        self.url = f'/api/courses/{self.course.id}/grades/'
+
+    def test_enroll_cohort_then_grade_from_csv(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.post(f'{self.url}?mode=enroll', [{'student_id': self.students[0].id}], format='json')
+        rows = [{'student_id': student.id} for student in self.students[1:]]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'{self.url}?mode=enroll', rows, format='json')
+        self.assertEqual(response.data['created'], 29)
+        # Doesn't grow with the rows
+        self.assertLessEqual(len(queries), len(few))
+
+        sheet = 'student_id,grade\n' + ''.join(f'{student.id},b+\n' for student in self.students)
+        response = self.client.post(self.url, sheet, content_type='text/csv')
+        self.assertEqual((response.data['updated'], response.data['errors']), (30, []))
+        self.assertEqual(set(Enrollment.objects.values_list('grade', flat=True)), {'B+'})
+
+    def test_invalid_rows_block_the_sheet_unless_partial(self):
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        rows = [
+            {'student_id': self.students[0].id, 'grade': 'A'},
+            {'student_id': self.students[1].id, 'grade': 'A'},
+            {'student_id': 'x', 'grade': 'A'},
+            {'student_id': self.students[0].id, 'grade': 'Z'},
+            {'student_id': self.students[2].id, 'grade': 4},
+        ]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3, 4, 5])
+        self.assertEqual(Enrollment.objects.get().grade, 'N/A')
+
+        response = self.client.post(f'{self.url}?partial=true', {'rows': rows}, format='json')
+        self.assertEqual((response.status_code, response.data['updated']), (200, 1))
+        self.assertEqual(Enrollment.objects.get().grade, 'A')
+
+    def test_students_of_other_universities_are_rejected(self):
+        other = University.objects.create(name='Other University', location='Samarkand', foundation_year=2000)
+        outsider = User.objects.create(username='o', email='o@example.com', name='O', university=other)
+        response = self.client.post(f'{self.url}?mode=enroll', [{'student_id': outsider.id}], format='json')
+        self.assertEqual((response.status_code, response.data['created']), (400, 0))
+        self.assertEqual(response.data['errors'][0]['student_id'], outsider.id)
+        self.assertFalse(Enrollment.objects.exists())
+
+    def test_only_teachers_and_admins_can_grade(self):
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        rows = [{'student_id': self.students[0].id, 'grade': 'A'}]
+        self.client.force_authenticate(self.students[0])
+        self.assertEqual(self.client.post(self.url, rows, format='json').status_code, 403)
+        self.assertEqual(Enrollment.objects.get().grade, 'N/A')
+
+        teacher = User.objects.create(username='t', email='t@example.com', name='T', role='teacher',
+                                      university=self.university)
+        self.client.force_authenticate(teacher)
+        self.assertEqual(self.client.post(self.url, rows, format='json').status_code, 200)
+        self.assertEqual(Enrollment.objects.get().grade, 'A')
+
+
+# Pool workers load the project settings, so they still hash with PBKDF2
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher',
+                                     'django.contrib.auth.hashers.PBKDF2PasswordHasher'])
+class UserImportTests(APITestCase):
+    def setUp(self):
+        self.university = University.objects.create(name='Test University', location='Tashkent', foundation_year=1990)
+        self.admin = User.objects.create_user('a@example.com', 'admin', 'secret', name='A', role='admin')
+        self.client.force_authenticate(self.admin)
+
+    def test_csv_upload(self):
+        upload = SimpleUploadedFile('students.csv', (
+            'username,email,name,password,university\n'
+            's1,s1@example.com,Student One,pw1,Test University\n'
+            f's2,s2@example.com,Student Two,pw2,{self.university.id}\n'
+            'admin,new@example.com,Taken,pw,\n'
+            's3,s3@example.com,Student Three,,Nowhere\n'
+        ).encode())
+        response = self.client.post('/api/users/import/', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['processed'], response.data['created']), (4, 2))
+        self.assertEqual([error['row'] for error in response.data['errors']], [4, 5])
+        student = User.objects.get(username='s1')
+        self.assertEqual(student.university, self.university)
+        self.assertTrue(student.check_password('pw1'))
+
+    def test_management_command_with_process_pool(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as source:
+            source.write('{"username": "n1", "email": "n1@example.com", "name": "N1", "password": "pw"}\n')
+            source.write('not json\n')
+            source.write('{"username": "n2", "email": "n2@example.com", "name": "N2", "role": "teacher"}\n')
+        self.addCleanup(os.remove, source.name)
+
+        out = io.StringIO()
+        call_command('import_users', source.name, '--workers', '2', '--chunk-size', '2',
+                     stdout=out, stderr=io.StringIO())
+        self.assertIn('Imported 2 of 3 users', out.getvalue())
+        self.assertTrue(User.objects.get(username='n1').check_password('pw'))
+        self.assertFalse(User.objects.get(username='n2').has_usable_password())
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        self.university = University.objects.create(name='Test University', location='Tashkent', foundation_year=1990)
+        self.math = Course.objects.create(name='Math', credits=4, university=self.university)
+        self.physics = Course.objects.create(name='Physics', credits=2, university=self.university)
+        self.student = User.objects.create(username='s1', email='s1@example.com', name='Student, One',
+                                           university=self.university)
+        Enrollment.objects.create(student=self.student, course=self.math, grade='C')
+        Enrollment.objects.create(student=self.student, course=self.physics, grade='D')
+        self.client.force_authenticate(User.objects.create_user('a@example.com', 'admin', 'secret', name='A',
+                                                                role='admin'))
+
+    def content(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_student_csv_export(self):
+        lines = self.content(self.client.get('/api/users/export/?role=student')).splitlines()
+        self.assertEqual(lines, [
+            'Student ID,Name,Email,GPA,Total Credits,Courses,Grades',
+            's1,"Student, One",s1@example.com,1.67,6,Math;Physics,C;D',
+        ])
+
+    def test_course_ndjson_export(self):
+        lines = self.content(self.client.get('/api/courses/export/?file_format=ndjson')).splitlines()
+        self.assertEqual([json.loads(line)['studentCount'] for line in lines], [1, 1])
+
+    def test_report_export(self):
+        response = self.client.get(f'/api/universities/{self.university.id}/report/export/?file_format=ndjson')
+        row = json.loads(self.content(response))
+        self.assertEqual((row['gpa'], row['passingStatus'], len(row['courses'])), ('1.67', 'Not Passing', 2))
+        self.assertIn('Test_University_Report.ndjson', response['Content-Disposition'])
+        self.assertEqual(self.client.get('/api/courses/export/?file_format=xml').status_code, 400)
+
+    def test_student_export_keeps_ordering_and_prefetch(self):
+        def export(url):
+            with CaptureQueriesContext(connection) as queries:
+                lines = self.content(self.client.get(url)).splitlines()
+            return [json.loads(line) for line in lines], len(queries)
+
+        url = '/api/users/export/?role=student&file_format=ndjson&fields=id&ordering=-gpa'
+        rows, few = export(url)
+        for i, grade in enumerate(['A', 'B', 'F']):
+            student = User.objects.create(username=f's{i + 2}', email=f's{i + 2}@example.com', name='S',
+                                          university=self.university)
+            Enrollment.objects.create(student=student, course=self.math, grade=grade)
+        rows, many = export(url)
+        self.assertEqual([row['gpa'] for row in rows], ['4.00', '3.00', '1.67', '0.00'])
+        self.assertEqual(many, few)
+
+    def test_streams_asynchronously_under_asgi(self):
+        admin = User.objects.get(username='admin')
+        headers = {'Authorization': f'Token {Token.objects.create(user=admin).key}'}
+
+        async def export(path, **extra):
+            response = await self.async_client.get(path, headers={**headers, **extra})
+            self.assertTrue(response.is_async)
+            return response, b''.join([chunk async for chunk in response.streaming_content])
+
+        response, content = async_to_sync(export)('/api/users/export/?role=student')
+        self.assertEqual(content.decode().splitlines()[1], 's1,"Student, One",s1@example.com,1.67,6,Math;Physics,C;D')
+        response, content = async_to_sync(export)('/api/courses/export/?file_format=ndjson',
+                                                  **{'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(gzip.decompress(content).splitlines()), 2)
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.university = University.objects.create(name='Test University', location='Tashkent', foundation_year=1990)
+        self.user = User.objects.create_user('a@example.com', 'admin', 'secret', name='A', university=self.university)
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_cached_token_costs_no_queries(self):
+        self.client.get('/api/user-roles/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/current-user/')
+        self.assertEqual(response.data['university_id'], self.university.id)
+        # Only the enrollments of the serialized user
+        self.assertEqual(len(queries), 1)
+
+    def test_writes_invalidate_the_cache(self):
+        self.client.get('/api/current-user/')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/current-user/').status_code, 401)
+
+        self.user.is_active = True
+        self.user.save()
+        self.client.get('/api/current-user/')
+        self.token.delete()
+        self.assertEqual(self.client.get('/api/current-user/').status_code, 401)
+
+
+@override_settings(SIGNED_TOKENS={'ENABLED': True, 'ACCESS_TTL': 60, 'REFRESH_TTL': 600},
+                   PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SignedTokenTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        ip_limiter.clear()
+        username_limiter.clear()
+        self.user = User.objects.create_user('a@example.com', 'admin', 'secret', name='A')
+
+    def login(self):
+        self.client.credentials()
+        response = self.client.post('/api/login/', {'username': 'admin', 'password': 'secret'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_access_token_needs_no_queries_once_user_is_cached(self):
+        tokens = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {tokens['access_token']}")
+        self.assertEqual(self.client.get('/api/user-roles/').status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/user-roles/')
+        self.assertEqual((response.status_code, len(queries)), (200, 0))
+
+        # The opaque token keeps working
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {tokens['token']}")
+        self.assertEqual(self.client.get('/api/current-user/').status_code, 200)
+
+    def test_refresh_rotation_revocation_and_password_change(self):
+        tokens = self.login()
+        refreshed = self.client.post('/api/token/refresh/', {'refresh_token': tokens['refresh_token']}).data
+        self.assertIn('access_token', refreshed)
+        # Refresh tokens are single use
+        response = self.client.post('/api/token/refresh/', {'refresh_token': tokens['refresh_token']})
+        self.assertEqual(response.status_code, 401)
+
+        self.client.post('/api/token/revoke/', {'token': refreshed['access_token']})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {refreshed['access_token']}")
+        self.assertEqual(self.client.get('/api/current-user/').status_code, 401)
+
+        tokens = self.login()
+        self.user.set_password('changed')
+        self.user.save()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {tokens['access_token']}")
+        self.assertEqual(self.client.get('/api/current-user/').status_code, 401)
+
+    def test_api_token_auth_and_tampering(self):
+        tokens = self.client.post('/api/api-token-auth/', {'username': 'admin', 'password': 'secret'}).data
+        self.assertEqual(set(tokens), {'token', 'access_token', 'refresh_token', 'expires_in'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {tokens['access_token']}x")
+        self.assertEqual(self.client.get('/api/current-user/').status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {tokens['refresh_token']}")
+        self.assertEqual(self.client.get('/api/current-user/').status_code, 401)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoginTests(APITestCase):
+    def setUp(self):
+        ip_limiter.clear()
+        username_limiter.clear()
+        User.objects.create_user('a@example.com', 'admin', 'secret', name='A')
+
+    def login(self, password='secret', username='admin'):
+        return self.client.post('/api/login/', {'username': username, 'password': password}, format='json')
+
+    def test_login(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['token'], Token.objects.get().key)
+        self.assertEqual(self.login('wrong').status_code, 401)
+        self.assertEqual(self.login(username='nobody').status_code, 401)
+
+    def test_username_is_throttled(self):
+        statuses = [self.login('wrong').status_code for i in range(username_limiter.burst + 1)]
+        self.assertEqual(statuses[-1], 429)
+        self.assertEqual(set(statuses[:-1]), {401})
+        self.assertEqual(self.login().status_code, 429)
+
+    def test_full_hashing_queue_is_rejected(self):
+        with mock.patch.object(BoundedExecutor, 'run', side_effect=Overloaded):
+            response = self.login()
+        self.assertEqual((response.status_code, response['Retry-After']), (503, '1'))
+
+    def test_token_auth_rejects_a_list_body(self):
+        response = self.client.post('/api/api-token-auth/', [{'username': 'admin'}], format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_non_string_credentials_are_rejected(self):
+        for body in [{'username': 5, 'password': 'x'}, {'username': 'admin', 'password': ['secret']}]:
+            with self.subTest(body=body):
+                self.assertEqual(self.client.post('/api/login/', body, format='json').status_code, 400)
+        response = self.client.post('/api/api-token-auth/', {'username': 5, 'password': 'x'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_client_ip_from_proxy_header(self):
+        request = RequestFactory().post('/api/login/', REMOTE_ADDR='10.0.0.1',
+                                        HTTP_X_FORWARDED_FOR='1.1.1.1, 2.2.2.2, 3.3.3.3')
+        self.assertEqual(client_ip(request), '10.0.0.1')
+        with self.settings(LOGIN_THROTTLE={'CLIENT_IP_HEADER': 'HTTP_X_FORWARDED_FOR', 'TRUSTED_PROXIES': 2}):
+            self.assertEqual(client_ip(request), '2.2.2.2')
+        with self.settings(LOGIN_THROTTLE={'CLIENT_IP_HEADER': 'HTTP_X_FORWARDED_FOR', 'TRUSTED_PROXIES': 4}):
+            self.assertEqual(client_ip(request), '10.0.0.1')
+
+
+class AsyncReadViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.university = University.objects.create(name='Test University', location='Tashkent', foundation_year=1990)
+        other = University.objects.create(name='Other University', location='Samarkand', foundation_year=2000)
+        self.math = Course.objects.create(name='Math', credits=4, university=self.university)
+        Course.objects.create(name='Art', credits=2, university=other)
+        self.admin = User.objects.create_user('a@example.com', 'admin', 'secret', name='A', role='admin',
+                                              university=self.university)
+        for i in range(3):
+            student = User.objects.create(username=f's{i}', email=f's{i}@example.com', name=f'S{i}',
+                                          university=self.university)
+            Enrollment.objects.create(student=student, course=self.math, grade='B')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.admin).key}')
+
+    def test_matches_sync_responses(self):
+        for path in ['users/', 'users/?role=student', f'users/{self.admin.id}/', 'current-user/',
+                     'courses/', f'courses/{self.math.id}/', 'universities/', f'universities/{self.university.id}/',
+                     'users/?fields=id,gpa', 'courses/?exclude=enrolled_count', 'universities/?fields=name']:
+            with self.subTest(path=path):
+                response = self.client.get(f'/api/async/{path}')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), self.client.get(f'/api/{path}').json())
+
+    def test_course_list_is_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/async/courses/')
+        self.assertEqual([course['enrolled_count'] for course in response.json()], [3])
+        # The token and the courses with their counts
+        self.assertEqual(len(queries), 2)
+
+    def test_errors(self):
+        self.assertEqual(self.client.get('/api/async/users/?role=dean').status_code, 400)
+        other = University.objects.get(name='Other University')
+        self.assertEqual(self.client.get(f'/api/async/universities/{other.id}/').status_code, 404)
+        self.assertEqual(self.client.post('/api/async/courses/').status_code, 405)
+        self.client.credentials()
+        self.assertEqual(self.client.get('/api/async/courses/').status_code, 401)
+
+
+class CatalogCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.university = University.objects.create(name='Test University', location='Tashkent', foundation_year=1990)
+        self.course = Course.objects.create(name='Math', credits=4, university=self.university)
+        self.client.force_authenticate(User.objects.create_user('a@example.com', 'admin', 'secret', name='A'))
+
+    def test_not_modified_and_cached_responses(self):
+        response = self.client.get('/api/courses/')
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/courses/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get('/api/courses/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code,
+                         304)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/courses/').data, response.data)
+        # Only the catalog version
+        self.assertEqual(len(queries), 1)
+        # Different parameters are cached separately
+        self.assertNotEqual(self.client.get('/api/courses/?university=0')['ETag'], etag)
+
+    def test_writes_invalidate(self):
+        url = f'/api/courses/{self.course.id}/'
+        etag = self.client.get(url)['ETag']
+        Enrollment.objects.create(student=User.objects.create(username='s', email='s@example.com', name='S'),
+                                  course=self.course)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.data['enrolled_count']), (200, 1))
+
+        etag = self.client.get('/api/universities/')['ETag']
+        self.client.patch(f'/api/universities/{self.university.id}/', {'name': 'Renamed'})
+        response = self.client.get('/api/universities/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.data[0]['name'], 'Renamed')
+
+    def test_versions_are_shared_between_processes(self):
+        response = self.client.get('/api/courses/')
+        # Another worker's write, which this process's cache never hears about
+        CacheVersion.objects.filter(key='catalog').update(version=F('version') + 60)
+        response = self.client.get('/api/courses/', HTTP_IF_NONE_MATCH=response['ETag'],
+                                   HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 200)
+        # A fresh process (empty cache) agrees on the version
+        etag = response['ETag']
+        cache.clear()
+        self.assertEqual(self.client.get('/api/courses/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_bootstrap(self):
+        response = self.client.get('/api/bootstrap/?include=courses')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user']['username'], 'admin')
+        self.assertEqual(response.data['roles']['teacher'], 'Teacher')
+        self.assertEqual([u['name'] for u in response.data['universities']], ['Test University'])
+        self.assertEqual([c['name'] for c in response.data['courses']], ['Math'])
+        self.assertNotIn('courses', self.client.get('/api/bootstrap/').data)
+
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/bootstrap/?include=courses', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        User.objects.filter(username='admin').get().save(update_fields=['name'])
+        self.assertEqual(self.client.get('/api/bootstrap/?include=courses', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class StoredGPATests(APITestCase):
+    def setUp(self):
+        self.university = University.objects.create(name='Test University', location='Tashkent', foundation_year=1990)
+        self.math = Course.objects.create(name='Math', credits=4, university=self.university)
+        self.art = Course.objects.create(name='Art', credits=2, university=self.university)
+        self.students = [User.objects.create(username=f's{i}', email=f's{i}@example.com', name=f'S{i}')
+                         for i in range(3)]
+        for student, grade in zip(self.students, ['A', 'B', 'C']):
+            Enrollment.objects.create(student=student, course=self.math, grade=grade)
+        Enrollment.objects.create(student=self.students[2], course=self.art, grade='A')
+        self.client.force_authenticate(User.objects.create_user('a@example.com', 'admin', 'secret', name='A',
+                                                                role='admin'))
+
+    def stored(self, student):
+        student.refresh_from_db()
+        return str(student.gpa), student.total_credits
+
+    def test_kept_up_to_date(self):
+        self.assertEqual(self.stored(self.students[2]), ('2.67', 6))
+        Enrollment.objects.set_for_student(self.students[2], {self.math.id: 'A', self.art.id: 'A'})
+        self.assertEqual(self.stored(self.students[2]), ('4.00', 6))
+
+        self.math.credits = 2
+        self.math.save()
+        Enrollment.objects.filter(student=self.students[2], course=self.art).update(grade='C')
+        call_command('recompute_gpa', stdout=io.StringIO())
+        self.assertEqual(self.stored(self.students[2]), ('3.00', 4))
+
+        self.art.delete()
+        self.assertEqual(self.stored(self.students[2]), ('4.00', 2))
+
+    def test_ordering_and_filters(self):
+        response = self.client.get('/api/users/?role=student&ordering=-gpa')
+        self.assertEqual([user['username'] for user in response.data], ['s0', 's1', 's2'])
+        self.assertEqual(response.data[0]['gpa'], '4.00')
+        response = self.client.get('/api/users/?role=student&gpa_min=2.8&ordering=gpa')
+        self.assertEqual([user['username'] for user in response.data], ['s1', 's0'])
+        response = self.client.get('/api/users/?ordering=-gpa&page_size=1')
+        self.assertEqual([user['username'] for user in response.data['results']], ['s0'])
+        self.assertEqual(self.client.get('/api/users/?gpa_min=high').status_code, 400)
+
+    def test_ordered_pages_can_be_walked(self):
+        User.objects.filter(username__in=['s0', 's2']).update(university=self.university)
+        for ordering, expected in [('-gpa', ['s0', 's1', 's2', 'admin']), ('total_credits', ['admin', 's0', 's1', 's2']),
+                                   ('university', ['s0', 's1', 's2', 'admin'])]:
+            with self.subTest(ordering=ordering):
+                usernames = []
+                url = f'/api/users/?ordering={ordering}&page_size=2'
+                while url:
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    usernames += [user['username'] for user in response.data['results']]
+                    url = response.data['next']
+                self.assertEqual(usernames, expected)
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        self.university = University.objects.create(name='Test University', location='Tashkent', foundation_year=1990)
+        self.math = Course.objects.create(name='Math', credits=4, university=self.university)
+        self.admin = User.objects.create_user('a@example.com', 'admin', 'secret', name='A', role='admin')
+        for i in range(3):
+            student = User.objects.create(username=f's{i}', email=f's{i}@example.com', name=f'S{i}')
+            Enrollment.objects.create(student=student, course=self.math, grade='B')
+        self.client.force_authenticate(self.admin)
+
+    def test_fields_and_exclude(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/users/?fields=id,name')
+        self.assertEqual(response.data[0], {'id': self.admin.id, 'name': 'A'})
+        self.assertEqual(len(queries), 1)
+
+        response = self.client.get('/api/users/?exclude=coursesWithGrades&exclude=role_display,status_display')
+        self.assertNotIn('coursesWithGrades', response.data[1])
+        self.assertEqual(response.data[1]['gpa'], '3.00')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/courses/?fields=id,name')
+        self.assertEqual(response.data, [{'id': self.math.id, 'name': 'Math'}])
+        self.assertNotIn('COUNT', queries[0]['sql'])
+        self.assertEqual(self.client.get(f'/api/courses/{self.math.id}/?exclude=description').data['enrolled_count'], 3)
+        self.assertEqual(list(self.client.get('/api/universities/?fields=name').data[0]), ['name'])
+
+    def test_unknown_field_is_rejected(self):
+        self.assertEqual(self.client.get('/api/users/?fields=id,salary').status_code, 400)
+        self.assertEqual(self.client.get('/api/courses/?exclude=salary').status_code, 400)
+
+
+class FastListTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.university = University.objects.create(name='Universitet \u2028 «Test»', location='Tashkent',
+                                                    foundation_year=1990, website='example.com')
+        University.objects.create(name='Other', location='Samarkand', foundation_year=2000)
+        self.math = Course.objects.create(name='Math', credits=4, university=self.university, description='x\ny')
+        Course.objects.create(name='Math', credits=3, university=self.university)
+        self.client.force_authenticate(User.objects.create_user('a@example.com', 'admin', 'secret', name='A',
+                                                                role='admin', status='suspended'))
+        for i in range(3):
+            student = User.objects.create(username=f's{i}', email=f's{i}@example.com', name=f'Ünïcode "{i}"',
+                                          university=self.university if i else None)
+            Enrollment.objects.create(student=student, course=self.math, grade='B+')
+
+    def test_same_bytes_as_the_serializers(self):
+        for path in ['users/', 'users/?fields=name,gpa&ordering=-gpa', 'users/?exclude=coursesWithGrades',
+                     'courses/', 'courses/?fields=name', 'universities/', 'universities/?exclude=id']:
+            with self.subTest(path=path):
+                cache.clear()
+                fast = self.client.get(f'/api/{path}').content
+                cache.clear()
+                with override_settings(FAST_LIST_RESPONSES=False):
+                    self.assertEqual(fast, self.client.get(f'/api/{path}').content)
+
+    def test_query_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/users/')
+        self.assertEqual(len(queries), 2)
+
+
+class ResponseFormatTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.university = University.objects.create(name='Test University', location='Tashkent', foundation_year=1990)
+        self.client.force_authenticate(User.objects.create_user('a@example.com', 'admin', 'secret', name='A',
+                                                                role='admin'))
+        for i in range(30):
+            User.objects.create(username=f's{i}', email=f's{i}@example.com', name=f'Student {i}',
+                                university=self.university)
+
+    def test_columnar_lists(self):
+        rows = self.client.get('/api/users/?fields=id,username').json()
+        response = self.client.get('/api/users/?fields=id,username&format=columnar')
+        self.assertEqual(response['Content-Type'], 'application/vnd.columnar+json')
+        self.assertEqual(response.json(), {'columns': ['id', 'username'],
+                                           'rows': [[row['id'], row['username']] for row in rows]})
+        # Not a list: plain JSON
+        detail = self.client.get(f'/api/universities/{self.university.id}/', HTTP_ACCEPT='application/vnd.columnar+json')
+        self.assertEqual(detail.json()['name'], 'Test University')
+
+    @unittest.skipUnless(msgpack, 'msgpack is not installed')
+    def test_msgpack(self):
+        response = self.client.get('/api/users/?format=msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), self.client.get('/api/users/').json())
+
+    def test_compression(self):
+        plain = self.client.get('/api/users/')
+        response = self.client.get('/api/users/', HTTP_ACCEPT_ENCODING='gzip;q=1.0, identity; q=0.5')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        # Under COMPRESSION['MIN_SIZE']
+        small = self.client.get(f'/api/universities/{self.university.id}/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(small.has_header('Content-Encoding'))
+        self.assertFalse(self.client.get('/api/users/', HTTP_ACCEPT_ENCODING='gzip;q=0').has_header('Content-Encoding'))
+
+    def test_streaming_compression(self):
+        response = self.client.get('/api/users/export/?role=student', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(len(lines), 31)
+
+    def test_async_streaming_is_one_gzip_stream(self):
+        async def chunks():
+            for i in range(3):
+                yield f'chunk {i}\n'.encode()
+
+        middleware = CompressionMiddleware(lambda request: StreamingHttpResponse(chunks()))
+        response = middleware(RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip'))
+
+        async def read():
+            return b''.join([chunk async for chunk in response])
+
+        body = async_to_sync(read)()
+        self.assertEqual(gzip.decompress(body), b'chunk 0\nchunk 1\nchunk 2\n')
+        self.assertEqual(body.count(b'\x1f\x8b'), 1)
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings('gzip, deflate, BR;q=0.5, zstd;q=0'), {'gzip', 'deflate', 'br'})
+
+
+class RequestMetricsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        reset_metrics()
+        self.university = University.objects.create(name='Test University', location='Tashkent', foundation_year=1990)
+        self.admin = User.objects.create_user('a@example.com', 'admin', 'secret', name='A', role='admin')
+        for i in range(3):
+            User.objects.create(username=f's{i}', email=f's{i}@example.com', name=f'S{i}', university=self.university)
+        self.client.force_authenticate(self.admin)
+
+    def test_server_timing_and_log_line(self):
+        with CaptureQueriesContext(connection) as queries, self.assertLogs('myapp.performance', 'INFO') as logs:
+            response = self.client.get('/api/users/')
+        timing = dict(re.findall(r'(\w+);dur=([\d.]+)', response['Server-Timing']))
+        self.assertEqual(set(timing), {'db', 'serialize', 'render', 'view', 'total'})
+        self.assertIn(f'desc="{len(queries)} queries"', response['Server-Timing'])
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((line['endpoint'], line['status'], line['queries']), ('user-list', 200, len(queries)))
+        self.assertGreaterEqual(line['total_ms'], line['view_ms'])
+
+    def test_serializer_time_is_counted(self):
+        with override_settings(FAST_LIST_RESPONSES=False):
+            response = self.client.get('/api/courses/')
+        self.assertRegex(response['Server-Timing'], r'serialize;dur=\d')
+        with self.assertLogs('myapp.performance', 'INFO') as logs:
+            self.client.get('/api/users/?ordering=gpa')
+        self.assertGreater(json.loads(logs.records[-1].getMessage())['serialize_ms'], 0)
+
+    def test_prometheus_endpoint(self):
+        self.client.get('/api/users/')
+        self.client.get('/api/users/')
+        body = self.client.get('/api/metrics/').content.decode()
+        self.assertIn('# TYPE myapp_request_duration_seconds histogram', body)
+        self.assertIn('myapp_request_queries_count{endpoint="user-list",method="GET"} 2', body)
+        self.assertIn('myapp_request_duration_seconds_bucket{endpoint="user-list",method="GET",le="+Inf"} 2', body)
+
+        self.client.force_authenticate(User.objects.get(username='s0'))
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+
+class ProfilingTests(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        settings = override_settings(PROFILING={'ENABLED': True, 'DIR': self.directory.name, 'KEEP': 2})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.superuser = User.objects.create_superuser('root@example.com', 'root', 'secret', name='Root')
+        self.admin = User.objects.create_user('a@example.com', 'admin', 'secret', name='A', role='admin')
+
+    def get(self, path, user, **extra):
+        return self.client.get(path, HTTP_AUTHORIZATION=f'Token {Token.objects.get_or_create(user=user)[0].key}',
+                               **extra)
+
+    def test_superuser_profile(self):
+        response = self.get('/api/users/?profile=1', self.superuser)
+        self.assertEqual(response.status_code, 200)
+        profile_id = response['Profile-Id']
+        listing = self.get('/api/profiles/', self.superuser).json()
+        self.assertEqual([(p['id'], p['path'], p['user']) for p in listing],
+                         [(profile_id, '/api/users/?profile=1', 'root')])
+
+        download = self.get(f'/api/profiles/{profile_id}/', self.superuser)
+        path = os.path.join(self.directory.name, 'download.prof')
+        with open(path, 'wb') as f:
+            f.write(b''.join(download.streaming_content))
+        self.assertTrue(pstats.Stats(path).total_calls > 0)
+        self.assertEqual(self.get('/api/profiles/../', self.superuser).status_code, 404)
+
+    def test_only_superusers(self):
+        self.assertFalse(self.get('/api/users/', self.admin, HTTP_X_PROFILE='1').has_header('Profile-Id'))
+        self.assertFalse(self.client.get('/api/users/?profile=1').has_header('Profile-Id'))
+        self.assertEqual(self.get('/api/profiles/', self.admin).status_code, 403)
+
+    def test_keeps_the_newest(self):
+        ids = [self.get('/api/universities/', self.superuser, HTTP_X_PROFILE='1')['Profile-Id'] for _ in range(3)]
+        self.assertEqual([p['id'] for p in self.get('/api/profiles/', self.superuser).json()], ids[:0:-1])
+        self.assertEqual(len(os.listdir(self.directory.name)), 4)
+
+
+class NPlusOneTests(APITestCase):
+    def setUp(self):
+        self.university = University.objects.create(name='Test University', location='Tashkent', foundation_year=1990)
+        for i in range(5):
+            Course.objects.create(name=f'Course {i}', credits=3, university=self.university)
+
+    def per_row(self):
+        return CourseSerializer(Course.objects.all(), many=True).data
+
+    @override_settings(NPLUSONE={'RAISE': True, 'THRESHOLD': 3})
+    def test_repeated_queries_fail_with_the_stack(self):
+        with self.assertRaises(RepeatedQueriesError) as raised:
+            with detect_repeated_queries('courses'):
+                self.per_row()
+        message = str(raised.exception)
+        self.assertIn('5 x SELECT', message)
+        self.assertIn('"myapp_university"', message)
+        self.assertIn('in per_row', message)
+        self.assertIn('in get_enrolled_count', message)
+
+        with detect_repeated_queries('courses'):
+            courses = Course.objects.select_related('university').annotate(enrolled_count=Count('enrollments'))
+            CourseSerializer(courses, many=True).data
+            with allow_repeated_queries():
+                self.per_row()
+
+    @override_settings(NPLUSONE={'ENABLED': True, 'RAISE': False, 'THRESHOLD': 3})
+    def test_middleware_warns(self):
+        def view(request):
+            self.per_row()
+            return HttpResponse()
+
+        with self.assertLogs('myapp.nplusone', 'WARNING') as logs:
+            QueryCheckMiddleware(view)(RequestFactory().get('/api/courses/'))
+        self.assertIn('GET /api/courses/: repeated queries', logs.output[0])
+
+    def test_object_permission_compares_ids(self):
+        admin = User.objects.create_user('a@example.com', 'admin', 'secret', name='A', role='admin',
+                                         university=self.university)
+        admin = User.objects.get(pk=admin.pk)
+        request = RequestFactory().get('/')
+        request.user = admin
+        permission = IsHeadAdminOrUniversityAdmin()
+        with self.assertNumQueries(0):
+            self.assertTrue(permission.has_object_permission(request, None, Course(university_id=self.university.id)))
+            self.assertFalse(permission.has_object_permission(request, None, Course(university_id=0)))
+            self.assertTrue(permission.has_object_permission(request, None, self.university))
+
+
+class UserFilterTests(APITestCase):
+    def setUp(self):
+        self.university = University.objects.create(name='Test University', location='Tashkent', foundation_year=1990)
+        self.admin = User.objects.create_user('a@example.com', 'admin', 'secret', name='A', role='admin')
+        User.objects.create(username='t1', email='t1@example.com', name='T1', role='teacher', university=self.university)
+        User.objects.create(username='t2', email='t2@example.com', name='T2', role='teacher', status='inactive')
+        User.objects.create(username='s1', email='s1@example.com', name='S1', university=self.university)
+        self.client.force_authenticate(self.admin)
+
+    def usernames(self, query):
+        response = self.client.get(f'/api/users/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return sorted(user['username'] for user in response.data)
+
+    def test_filters(self):
+        self.assertEqual(self.usernames(f'role=teacher&university={self.university.id}'), ['t1'])
+        self.assertEqual(self.usernames('role=teacher,admin&status=active'), ['admin', 't1'])
+        self.assertEqual(self.usernames(f'university={self.university.id}&university=none&role=teacher'), ['t1', 't2'])
+        self.assertEqual(self.usernames('status=inactive'), ['t2'])
+
+    def test_invalid_values_are_rejected(self):
+        self.assertEqual(self.client.get('/api/users/?role=dean').status_code, 400)
+        self.assertEqual(self.client.get('/api/users/?university=abc').status_code, 400)
+
+
+class SQLitePragmaTests(TransactionTestCase):
+    def pragmas(self):
+        with tempfile.TemporaryDirectory() as directory:
+            conn = connection.copy()
+            conn.settings_dict = {**conn.settings_dict, 'NAME': os.path.join(directory, 'pragmas.sqlite3')}
+            try:
+                with conn.cursor() as cursor:
+                    return [cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                            for name in ['journal_mode', 'busy_timeout', 'synchronous']]
+            finally:
+                conn.close()
+
+    def test_pragmas_applied_to_new_connections(self):
+        with self.settings(SQLITE_PRAGMAS=settings.SQLITE_PRODUCTION_PRAGMAS):
+            self.assertEqual(self.pragmas(), ['wal', 5000, 1])
+
+    def test_development_keeps_the_rollback_journal(self):
+        with self.settings(SQLITE_PRAGMAS={'busy_timeout': 5000}):
+            self.assertEqual(self.pragmas(), ['delete', 5000, 2])
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+        def view(request):
+            if request.method == 'POST':
+                self.router.db_for_write(User)
+            return HttpResponse(self.router.db_for_read(User))
+
+        self.middleware = PrimaryPinningMiddleware(view)
+
+    def read_alias(self, method='get', token='a'):
+        request = getattr(self.factory, method)('/api/users/', HTTP_AUTHORIZATION=f'Token {token}')
+        return self.middleware(request).content.decode()
+
+    def test_reads_use_replica_and_writes_pin_the_caller(self):
+        self.assertEqual(self.router.db_for_read(User), 'default')
+        self.assertEqual(self.read_alias(), 'replica')
+        self.assertEqual(self.read_alias('post'), 'default')
+        self.assertEqual(self.read_alias(), 'default')
+        self.assertEqual(self.read_alias(token='b'), 'replica')
+        cache.clear()
+        self.assertEqual(self.read_alias(), 'replica')
+
+
+class EnrollmentMigrationTests(TransactionTestCase):
+    migrate_from = [('myapp', '0006_enrollment')]
+    migrate_to = [('myapp', '0007_move_courseswithgrades_to_enrollment')]
+
+    def tearDown(self):
+        # Leave the schema fully migrated for the tests that follow
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_json_grades_are_moved_into_enrollments(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        old_apps = executor.loader.project_state(self.migrate_from).apps
+
+        OldUniversity = old_apps.get_model('myapp', 'University')
+        OldCourse = old_apps.get_model('myapp', 'Course')
+        OldUser = old_apps.get_model('myapp', 'User')
+        university = OldUniversity.objects.create(name='U', location='L', foundation_year=2000)
+        course = OldCourse.objects.create(name='Math', credits=4, university=university)
+        user = OldUser.objects.create(username='s', email='s@example.com', name='S', coursesWithGrades=[
+            {'courseId': course.id, 'grade': 'B'},
+            {'courseId': str(course.id), 'grade': 'A'},
+            {'courseId': 424242, 'grade': 'C'},
+            'garbage',
+        ])
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.migrate_to)
+        new_apps = executor.loader.project_state(self.migrate_to).apps
+        NewEnrollment = new_apps.get_model('myapp', 'Enrollment')
+
+        self.assertEqual(
+            list(NewEnrollment.objects.values_list('student_id', 'course_id', 'grade')),
+            [(user.id, course.id, 'A')],
+        )
+
+
+class GPASummaryMigrationTests(TransactionTestCase):
+    migrate_from = [('myapp', '0010_user_filter_indexes')]
+    migrate_to = [('myapp', '0011_user_gpa_summary')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_existing_users_get_their_gpa(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        old_apps = executor.loader.project_state(self.migrate_from).apps
+        university = old_apps.get_model('myapp', 'University').objects.create(name='U', location='L',
+                                                                                foundation_year=2000)
+        Course = old_apps.get_model('myapp', 'Course')
+        math = Course.objects.create(name='Math', credits=4, university=university)
+        art = Course.objects.create(name='Art', credits=2, university=university)
+        OldUser = old_apps.get_model('myapp', 'User')
+        student = OldUser.objects.create(username='s', email='s@example.com', name='S')
+        OldUser.objects.create(username='t', email='t@example.com', name='T')
+        Enrollment = old_apps.get_model('myapp', 'Enrollment')
+        Enrollment.objects.create(student=student, course=math, grade='C')
+        Enrollment.objects.create(student=student, course=art, grade='A')
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.migrate_to)
+        NewUser = executor.loader.project_state(self.migrate_to).apps.get_model('myapp', 'User')
+        self.assertEqual(list(NewUser.objects.order_by('username').values_list('gpa', 'total_credits')),
+                         [(Decimal('2.67'), 6), (Decimal('0.00'), 0)])
@@ -0,0 +1,97 @@
+"""
+In-memory token-bucket throttling for the login endpoints.
+
+Buckets are kept per worker process, so with N processes the effective
+limit is up to N times the configured rate; that is enough to blunt
+credential stuffing without a shared store.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucketLimiter:
+    """
+    One bucket of ``burst`` tokens per key, refilled at ``rate`` tokens per
+    second. Only the ``max_keys`` most recently used keys are tracked.
+    """
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def consume(self, key):
+        """Take a token for ``key``; return 0 if allowed, else seconds until one is available"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                wait = 0
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+    
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+def _limiter(name, default_per_minute, default_burst):
+    options = getattr(settings, 'LOGIN_THROTTLE', {})
+    return TokenBucketLimiter(rate=options.get(f'{name}_PER_MINUTE', default_per_minute) / 60,
+                              burst=options.get(f'{name}_BURST', default_burst))
+
+
+ip_limiter = _limiter('IP', 30, 30)
+username_limiter = _limiter('USERNAME', 5, 10)
+
+
+def client_ip(request):
+    """
+    The address the per-IP bucket is keyed on: REMOTE_ADDR by default.
+
+    Behind reverse proxies, set LOGIN_THROTTLE['CLIENT_IP_HEADER'] to the
+    META key they fill in (e.g. 'HTTP_X_FORWARDED_FOR') and
+    'TRUSTED_PROXIES' to how many of them append to it. The address added by
+    the outermost trusted proxy is used, as the entries before it come from
+    the client and can be forged. Without enough entries, REMOTE_ADDR is used.
+    """
+    options = getattr(settings, 'LOGIN_THROTTLE', {})
+    header = options.get('CLIENT_IP_HEADER', 'REMOTE_ADDR')
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    if header == 'REMOTE_ADDR':
+        return remote_addr
+    addresses = [address.strip() for address in request.META.get(header, '').split(',') if address.strip()]
+    proxies = max(1, options.get('TRUSTED_PROXIES', 1))
+    if len(addresses) < proxies:
+        return remote_addr
+    return addresses[-proxies]
+
+
+def check_login_throttle(request, username):
+    """Seconds the client has to wait before trying to log in again (0 if it may go ahead)"""
+    # str(): api-token-auth's serializer also accepts a number as the username
+    return max(ip_limiter.consume(client_ip(request)),
+               username_limiter.consume(str(username or '').lower()))
+
+
+class LoginThrottle(BaseThrottle):
+    """The login token buckets for DRF views such as api-token-auth"""
+    def allow_request(self, request, view):
+        # Other bodies (e.g. a JSON list) are left for the view to reject with a 400
+        username = request.data.get('username') if isinstance(request.data, dict) else None
+        self.wait_seconds = check_login_throttle(request, username)
+        return self.wait_seconds == 0
+    
+    def wait(self):
+        return self.wait_seconds
@@ -0,0 +1,100 @@
+"""
+Stateless signed access and refresh tokens.
+
+A token is the signed (HMAC with SECRET_KEY) set of claims
+{uid, role, uni, exp, jti, typ, pwd}, so any process sharing the secret can
+verify it without a database read. Access tokens are short-lived; refresh
+tokens last longer and are exchanged for a new pair. Revoked token ids are
+kept in the cache backend only until the token would have expired anyway.
+
+The "pwd" claim is a fingerprint of the password hash, so changing the
+password invalidates tokens issued before.
+
+Enabled with SIGNED_TOKENS['ENABLED']; the opaque authtoken keys keep
+working alongside.
+"""
+import secrets
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+ACCESS = 'access'
+REFRESH = 'refresh'
+SALT = 'myapp.tokens'
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def get_option(name, default):
+    return getattr(settings, 'SIGNED_TOKENS', {}).get(name, default)
+
+
+def signed_tokens_enabled():
+    return get_option('ENABLED', False)
+
+
+def is_signed_token(key):
+    # Opaque authtoken keys are plain hex; signed tokens contain the ":" separators
+    return ':' in key
+
+
+def password_fingerprint(user):
+    return salted_hmac(SALT, user.password or '').hexdigest()[:16]
+
+
+def matches_password(user, claims):
+    return constant_time_compare(password_fingerprint(user), claims.get('pwd', ''))
+
+
+def make_token(user, token_type):
+    ttl = get_option('ACCESS_TTL', 15 * 60) if token_type == ACCESS else get_option('REFRESH_TTL', 7 * 24 * 3600)
+    claims = {
+        'uid': user.id,
+        'role': user.role,
+        'uni': user.university_id,
+        'exp': int(time.time()) + ttl,
+        'jti': secrets.token_urlsafe(12),
+        'typ': token_type,
+        'pwd': password_fingerprint(user),
+    }
+    return signing.dumps(claims, salt=SALT)
+
+
+def issue_tokens(user):
+    """A fresh access / refresh token pair for the user, as returned by the login endpoints"""
+    return {
+        'access_token': make_token(user, ACCESS),
+        'refresh_token': make_token(user, REFRESH),
+        'expires_in': get_option('ACCESS_TTL', 15 * 60),
+    }
+
+
+def revocation_key(jti):
+    return f'myapp:revoked-token:{jti}'
+
+
+def verify_token(token, token_type):
+    """Return the claims of a valid, unexpired, unrevoked token of the given type"""
+    try:
+        claims = signing.loads(token, salt=SALT)
+    except signing.BadSignature:
+        raise InvalidToken('Invalid token.')
+    if claims.get('typ') != token_type:
+        raise InvalidToken('Wrong token type.')
+    if claims.get('exp', 0) < time.time():
+        raise InvalidToken('Token has expired.')
+    if cache.get(revocation_key(claims.get('jti'))):
+        raise InvalidToken('Token has been revoked.')
+    return claims
+
+
+def revoke_token(claims):
+    """Revoke a verified token; the entry disappears once the token would have expired"""
+    remaining = int(claims['exp'] - time.time()) + 1
+    if remaining > 0:
+        cache.set(revocation_key(claims['jti']), True, remaining)
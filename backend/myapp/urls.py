@@ -1,7 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
-from rest_framework.authtoken import views as auth_views
+from . import views, async_views
 
 router = DefaultRouter()
 router.register(r'users', views.UserViewSet)
@@ -10,11 +9,24 @@ router.register(r'courses', views.CourseViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('bootstrap/', views.BootstrapView.as_view(), name='bootstrap'),
     path('current-user/', views.get_current_user, name='current-user'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('profiles/', views.profile_list, name='profile-list'),
+    path('profiles/<str:profile_id>/', views.profile_download, name='profile-download'),
     path('user-roles/', views.get_user_roles, name='user-roles'),
     path('user-statuses/', views.get_user_statuses, name='user-statuses'),
-    path('login/', views.user_login, name='user-login'),
-    path('api-token-auth/', auth_views.obtain_auth_token, name='api-token-auth'),
+    path('login/', async_views.user_login, name='user-login'),
+    path('async/users/', async_views.user_list, name='async-user-list'),
+    path('async/users/<int:pk>/', async_views.user_detail, name='async-user-detail'),
+    path('async/courses/', async_views.course_list, name='async-course-list'),
+    path('async/courses/<int:pk>/', async_views.course_detail, name='async-course-detail'),
+    path('async/universities/', async_views.university_list, name='async-university-list'),
+    path('async/universities/<int:pk>/', async_views.university_detail, name='async-university-detail'),
+    path('async/current-user/', async_views.current_user, name='async-current-user'),
+    path('api-token-auth/', views.ObtainTokenView.as_view(), name='api-token-auth'),
+    path('token/refresh/', views.refresh_token, name='token-refresh'),
+    path('token/revoke/', views.revoke_signed_token, name='token-revoke'),
     path('debug/student/<int:pk>/', views.debug_student_data, name='debug-student'),
     path('debug/create-student/', views.debug_create_student, name='debug-create-student'),
 ]
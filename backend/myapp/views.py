@@ -1,60 +1,119 @@
-from django.shortcuts import render
+from django.shortcuts import render, get_object_or_404
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes, authentication_classes
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, action
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import make_password
 from rest_framework.views import APIView
-from django.http import Http404
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import JSONParser, MultiPartParser
+from django.http import Http404, HttpResponse, FileResponse
+from django.db.models import Count, prefetch_related_objects
 import logging
 from rest_framework.authtoken.models import Token
-from django.contrib.auth import authenticate
 from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.views import ObtainAuthToken
 
-from .serializers import UserSerializer, UniversitySerializer, CourseSerializer
-from .models import University, Course
-from .permissions import IsHeadAdminOrUniversityAdmin
+from .serializers import UserSerializer, UniversitySerializer, CourseSerializer, EnrollmentSerializer
+from .models import University, Course, Enrollment
+from .permissions import IsHeadAdminOrUniversityAdmin, IsAdminRole, IsSuperuser
+from .filters import UserFilterBackend, UserOrderingFilter
+from .pagination import OptionalCursorPagination, NameCursorPagination
+from .reports import get_university_report
+from .gpa import student_gpa
+from .throttling import LoginThrottle
+from .caching import cached_catalog_response, get_user_version
+from .metrics import render_prometheus
+from .profiling import PROFILE_ID, list_profiles, profile_path
+from .fastrows import fast_lists_enabled, user_rows, course_rows, university_rows, UnsupportedField
+from .tokens import (
+    signed_tokens_enabled, issue_tokens, verify_token, revoke_token, matches_password, InvalidToken,
+    ACCESS, REFRESH,
+)
+from .gradesheets import apply_grade_sheet, MODES, MODE_GRADES
+from .parsers import CSVParser
+from .importers import UserImporter, detect_format, iter_rows, FORMATS as IMPORT_FORMATS
+from .exports import (
+    export_response, iter_students, iter_courses, student_csv_row, course_csv_row, report_csv_row,
+    report_json_row, STUDENT_COLUMNS, COURSE_COLUMNS, REPORT_COLUMNS, FORMATS as EXPORT_FORMATS,
+)
 
 # Set up logging
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+def get_export_format(request):
+    """The ?file_format= of an export request, csv by default (None if invalid)"""
+    file_format = request.query_params.get('file_format', 'csv')
+    return file_format if file_format in EXPORT_FORMATS else None
+
+def export_format_error():
+    return Response({'error': f"file_format must be one of: {', '.join(EXPORT_FORMATS)}"},
+                    status=status.HTTP_400_BAD_REQUEST)
+
 class UserViewSet(viewsets.ModelViewSet):
     """
     API endpoint for managing users
     """
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    pagination_class = OptionalCursorPagination
+    filter_backends = [UserFilterBackend, UserOrderingFilter]
     # Change permission to require authentication
     permission_classes = [permissions.IsAuthenticated]
     
-    def get_queryset(self):
-        """Filter users based on role and university"""
-        user = self.request.user
+    @staticmethod
+    def visible_to(user):
+        """Users the given user may see"""
+        queryset = User.objects.select_related('university')
         
         # Students can see all users (previously they could only see themselves)
         if user.role == 'student':
             # For students, return all users or filter by their university
-            return User.objects.all()
+            return queryset
             # Alternative: return only users from their university:
-            # return User.objects.filter(university=user.university) if user.university else User.objects.all()
+            # return queryset.filter(university=user.university) if user.university else queryset
         
         # Teachers can see students and teachers from their university
-        if user.role == 'teacher' and user.university:
-            return User.objects.filter(university=user.university)
+        if user.role == 'teacher' and user.university_id:
+            return queryset.filter(university_id=user.university_id)
         
         # University admins can see all users from their university
-        if user.university and not user.is_superuser:
-            return User.objects.filter(university=user.university)
+        if user.university_id and not user.is_superuser:
+            return queryset.filter(university_id=user.university_id)
             
         # Head admins can see all users
-        return User.objects.all()
+        return queryset
+    
+    def get_queryset(self):
+        """Filter users based on role and university"""
+        queryset = self.visible_to(self.request.user)
+        # Skipped when ?fields= / ?exclude= leave out coursesWithGrades
+        if 'coursesWithGrades' in self.get_serializer().fields:
+            # Load enrollments in one query for the whole page instead of one per user
+            queryset = queryset.prefetch_related('enrollments')
+        return queryset
     
     def list(self, request, *args, **kwargs):
         try:
             queryset = self.filter_queryset(self.get_queryset())
+            
+            # Opt-in cursor pagination (?cursor= / ?page_size=)
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+            
             serializer = self.get_serializer(queryset, many=True)
+            if fast_lists_enabled():
+                try:
+                    return Response(user_rows(serializer, queryset))
+                except UnsupportedField:
+                    pass
             return Response(serializer.data)
+        except APIException:
+            # e.g. an invalid cursor, which should stay a 404
+            raise
         except Exception as e:
             logger.error(f"Error in UserViewSet.list: {str(e)}")
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -82,6 +141,86 @@ class UserViewSet(viewsets.ModelViewSet):
         except Exception as e:
             logger.error(f"Error in perform_update: {str(e)}")
             raise
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream the users visible to the caller (with the usual filters and
+        ?ordering=) as CSV or NDJSON (?file_format=csv|ndjson), including GPA
+        and courses
+        """
+        file_format = get_export_format(request)
+        if file_format is None:
+            return export_format_error()
+        # Not get_queryset(): its prefetch depends on ?fields=, and every row needs the enrollments
+        queryset = self.filter_queryset(self.visible_to(request.user)).prefetch_related('enrollments')
+        return export_response(request, iter_students(queryset), file_format, 'student-data',
+                               STUDENT_COLUMNS, student_csv_row)
+    
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_users(self, request):
+        """
+        Bulk import users from an uploaded CSV or NDJSON "file".
+        The format is taken from the file extension or a "file_format" field.
+        University admins can only import into their own university.
+        """
+        user = request.user
+        if not (user.is_superuser or user.role == 'admin'):
+            return Response({'error': 'Only admins can import users'}, status=status.HTTP_403_FORBIDDEN)
+        
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Please upload a "file"'}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('file_format') or detect_format(upload.name)
+        if file_format not in IMPORT_FORMATS:
+            return Response({'error': f"file_format must be one of: {', '.join(IMPORT_FORMATS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        # Same scoping as get_queryset: university admins stay within their university
+        university = user.university if user.university and not user.is_superuser else None
+        
+        try:
+            result = UserImporter(university=university).run(iter_rows(upload, file_format))
+        except Exception as e:
+            logger.error(f"Error in UserViewSet.import_users: {str(e)}")
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response(result, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['put', 'delete'], url_path=r'enrollments/(?P<course_id>[0-9]+)')
+    def enrollment(self, request, pk=None, course_id=None):
+        """
+        Enroll the user in a course or change its grade (PUT {"grade": "A"}),
+        or unenroll them (DELETE), without rewriting their other enrollments.
+        Responds with the enrollment and the user's new GPA.
+        Only teachers and admins can change enrollments, and only for courses
+        of their own university (head admins for any course).
+        """
+        caller = request.user
+        if not (caller.is_superuser or caller.role in ('teacher', 'admin')):
+            return Response({'error': 'Only teachers and admins can change enrollments'},
+                            status=status.HTTP_403_FORBIDDEN)
+        user = self.get_object()
+        course = get_object_or_404(Course, id=course_id)
+        if caller.university_id and not caller.is_superuser and course.university_id != caller.university_id:
+            return Response({'error': 'The course belongs to another university'},
+                            status=status.HTTP_403_FORBIDDEN)
+        
+        if request.method == 'DELETE':
+            deleted, _ = Enrollment.objects.filter(student=user, course=course).delete()
+            if not deleted:
+                raise Http404('User is not enrolled in this course')
+            return Response({'studentId': user.id, 'courseId': course.id, 'gpa': student_gpa(user.id)})
+        
+        serializer = EnrollmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        enrollment, created = Enrollment.objects.update_or_create(
+            student=user,
+            course=course,
+            defaults={'grade': serializer.validated_data.get('grade') or 'N/A'},
+        )
+        data = EnrollmentSerializer(enrollment).data
+        data['gpa'] = student_gpa(user.id)
+        return Response(data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
 class UniversityViewSet(viewsets.ModelViewSet):
     """
@@ -89,60 +228,140 @@ class UniversityViewSet(viewsets.ModelViewSet):
     """
     queryset = University.objects.all()
     serializer_class = UniversitySerializer
+    pagination_class = NameCursorPagination
     permission_classes = [permissions.IsAuthenticated, IsHeadAdminOrUniversityAdmin]
     
-    def get_queryset(self):
-        """Filter universities by user access"""
-        user = self.request.user
-        
+    @staticmethod
+    def visible_to(user):
+        """Universities the user may see"""
         # Head admin sees all universities
-        if not user.university:
+        if not user.university_id:
             return University.objects.all()
             
         # University admin sees only their university
-        return University.objects.filter(id=user.university.id)
+        return University.objects.filter(id=user.university_id)
+    
+    def get_queryset(self):
+        """Filter universities by user access"""
+        return self.visible_to(self.request.user)
     
+    @cached_catalog_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
+    @cached_catalog_response
     def list(self, request, *args, **kwargs):
         try:
             queryset = self.filter_queryset(self.get_queryset())
+            
+            # Opt-in cursor pagination (?cursor= / ?page_size=)
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+            
             serializer = self.get_serializer(queryset, many=True)
+            if fast_lists_enabled():
+                try:
+                    return Response(university_rows(serializer, queryset))
+                except UnsupportedField:
+                    pass
             return Response(serializer.data)
+        except APIException:
+            # e.g. an invalid cursor, which should stay a 404
+            raise
         except Exception as e:
             logger.error(f"Error in UniversityViewSet.list: {str(e)}")
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=True, methods=['get'])
+    def report(self, request, pk=None):
+        """
+        Academic report for one university: student count, average GPA,
+        credit totals and per-course enrollment and grade distribution
+        """
+        try:
+            university = self.get_object()
+            return Response(get_university_report(university))
+        except APIException:
+            raise
+        except Exception as e:
+            logger.error(f"Error in UniversityViewSet.report: {str(e)}")
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=True, methods=['get'], url_path='report/export')
+    def export_report(self, request, pk=None):
+        """Stream the per-student rows of the university report as CSV or NDJSON"""
+        file_format = get_export_format(request)
+        if file_format is None:
+            return export_format_error()
+        university = self.get_object()
+        students = User.objects.filter(university=university, role='student').prefetch_related('enrollments')
+        filename = f"{university.name.replace(' ', '_')}_Report"
+        return export_response(request, iter_students(students), file_format, filename,
+                               REPORT_COLUMNS, report_csv_row, report_json_row)
+
 class CourseViewSet(viewsets.ModelViewSet):
     """
     API endpoint for managing courses
     """
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
+    pagination_class = NameCursorPagination
     permission_classes = [permissions.IsAuthenticated, IsHeadAdminOrUniversityAdmin]
     
+    @staticmethod
+    def visible_to(user):
+        """Courses the user may see"""
+        queryset = Course.objects.select_related('university')
+        
+        # Filter by user permissions
+        if user.is_authenticated and user.university_id:
+            # University admin can only see their university's courses
+            queryset = queryset.filter(university_id=user.university_id)
+            
+        return queryset
+    
     def get_queryset(self):
         """Filter courses by university and user access"""
-        user = self.request.user
         university_id = self.request.query_params.get('university', None)
-        
-        # Base queryset
-        queryset = Course.objects.all()
+        queryset = self.visible_to(self.request.user)
+        # Skipped when ?fields= / ?exclude= leave out enrolled_count
+        if 'enrolled_count' in self.get_serializer().fields:
+            # Enrollment counts for the whole page from one grouped query
+            queryset = queryset.annotate(enrolled_count=Count('enrollments'))
         
         # Apply university filter if provided
         if university_id is not None:
             queryset = queryset.filter(university_id=university_id)
-        
-        # Filter by user permissions
-        if user.is_authenticated and user.university:
-            # University admin can only see their university's courses
-            queryset = queryset.filter(university_id=user.university.id)
             
         return queryset
     
+    @cached_catalog_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
+    @cached_catalog_response
     def list(self, request, *args, **kwargs):
         try:
             queryset = self.filter_queryset(self.get_queryset())
+            
+            # Opt-in cursor pagination (?cursor= / ?page_size=)
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+            
             serializer = self.get_serializer(queryset, many=True)
+            if fast_lists_enabled():
+                try:
+                    return Response(course_rows(serializer, queryset))
+                except UnsupportedField:
+                    pass
             return Response(serializer.data)
+        except APIException:
+            # e.g. an invalid cursor, which should stay a 404
+            raise
         except Exception as e:
             logger.error(f"Error in CourseViewSet.list: {str(e)}")
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -156,6 +375,48 @@ class CourseViewSet(viewsets.ModelViewSet):
             serializer.save(university=user.university)
         else:
             serializer.save()
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream the courses visible to the caller as CSV or NDJSON (?file_format=csv|ndjson)"""
+        file_format = get_export_format(request)
+        if file_format is None:
+            return export_format_error()
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(request, iter_courses(queryset), file_format, 'course-data',
+                               COURSE_COLUMNS, course_csv_row)
+    
+    @action(detail=True, methods=['post'], parser_classes=[JSONParser, CSVParser])
+    def grades(self, request, pk=None):
+        """
+        Bulk grade sheet / cohort enrollment for this course.
+        
+        Body: a JSON list of {"student_id", "grade"} objects (or {"rows": [...]}),
+        or text/csv with a "student_id,grade" header.
+        ?mode=grades (default) only changes grades of enrolled students,
+        ?mode=enroll also enrolls the listed students.
+        Nothing is written if any row is invalid unless ?partial=true.
+        Only teachers and admins can grade.
+        """
+        user = request.user
+        if not (user.is_superuser or user.role in ('teacher', 'admin')):
+            return Response({'error': 'Only teachers and admins can grade'}, status=status.HTTP_403_FORBIDDEN)
+        course = self.get_object()
+        
+        mode = request.query_params.get('mode', MODE_GRADES)
+        if mode not in MODES:
+            return Response({'error': f"mode must be one of: {', '.join(MODES)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        partial = request.query_params.get('partial', '').lower() in ('1', 'true')
+        
+        rows = request.data
+        if isinstance(rows, dict):
+            rows = rows.get('rows')
+        if not isinstance(rows, list):
+            return Response({'error': 'Expected a list of rows'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = apply_grade_sheet(course, rows, mode=mode, partial=partial)
+        return Response(result, status=status.HTTP_200_OK if result['applied'] else status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])  # For development, allow any access
@@ -167,12 +428,78 @@ def get_current_user(request):
         if not request.user.is_authenticated:
             return Response({'error': 'Not authenticated'}, status=status.HTTP_401_UNAUTHORIZED)
         
+        # For coursesWithGrades; gpa is stored on the user and needs no enrollments
+        prefetch_related_objects([request.user], 'enrollments')
         serializer = UserSerializer(request.user)
         return Response(serializer.data)
     except Exception as e:
         logger.error(f"Error in get_current_user: {str(e)}")
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class BootstrapView(APIView):
+    """
+    Everything a page needs to start in one request: the current user,
+    role and status choices, the universities the caller may see and, with
+    ?include=courses, the caller's course catalog. Cached per user, with
+    the same ETag / 304 handling as the catalog endpoints.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_cache_scope(self, request):
+        return f'user:{request.user.id}:{get_user_version(request.user.id)}'
+    
+    @cached_catalog_response
+    def get(self, request):
+        try:
+            user = request.user
+            prefetch_related_objects([user], 'enrollments')
+            include = {value.strip() for value in request.query_params.get('include', '').split(',')}
+            
+            data = {
+                'user': UserSerializer(user).data,
+                'roles': dict(User.ROLE_CHOICES),
+                'statuses': dict(User.STATUS_CHOICES),
+                'universities': UniversitySerializer(UniversityViewSet.visible_to(user), many=True).data,
+            }
+            if 'courses' in include:
+                courses = CourseViewSet.visible_to(user).annotate(enrolled_count=Count('enrollments'))
+                data['courses'] = CourseSerializer(courses, many=True).data
+            return Response(data)
+        except Exception as e:
+            logger.error(f"Error in BootstrapView: {str(e)}")
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAdminRole])
+def metrics(request):
+    """
+    Per-endpoint request histograms (duration, view, DB, serializer and
+    render time, query count) for this process, in the Prometheus text format
+    """
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@api_view(['GET'])
+@permission_classes([IsSuperuser])
+def profile_list(request):
+    """
+    Saved request profiles, newest first. Profile a request by sending it
+    with "X-Profile: 1" or ?profile=1 as a superuser.
+    """
+    return Response(list_profiles())
+
+@api_view(['GET'])
+@permission_classes([IsSuperuser])
+def profile_download(request, profile_id):
+    """A saved profile as a pstats file"""
+    if not PROFILE_ID.match(profile_id):
+        raise Http404
+    try:
+        stats = open(profile_path(profile_id, 'prof'), 'rb')
+    except FileNotFoundError:
+        raise Http404
+    return FileResponse(stats, as_attachment=True, filename=f'{profile_id}.prof',
+                        content_type='application/octet-stream')
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])  # For development, allow any access
 def get_user_roles(request):
@@ -197,45 +524,63 @@ def get_user_statuses(request):
         logger.error(f"Error in get_user_statuses: {str(e)}")
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class ObtainTokenView(ObtainAuthToken):
+    """
+    api-token-auth: the usual {"token": ...} response, plus a signed
+    access/refresh token pair when signed tokens are enabled
+    """
+    throttle_classes = [LoginThrottle]
+    
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        token, created = Token.objects.get_or_create(user=user)
+        response_data = {'token': token.key}
+        if signed_tokens_enabled():
+            response_data.update(issue_tokens(user))
+        return Response(response_data)
+
 @api_view(['POST'])
+@authentication_classes([])
 @permission_classes([permissions.AllowAny])
-def user_login(request):
+def refresh_token(request):
     """
-    Custom login view that returns user data along with token
+    Exchange a refresh token for a new access/refresh pair.
+    The old refresh token is revoked, so each one can only be used once.
     """
+    if not signed_tokens_enabled():
+        return Response({'error': 'Signed tokens are disabled'}, status=status.HTTP_404_NOT_FOUND)
+    
     try:
-        username = request.data.get('username')
-        password = request.data.get('password')
-        
-        if not username or not password:
-            return Response({'error': 'Please provide both username and password'},
-                            status=status.HTTP_400_BAD_REQUEST)
-        
-        # Authenticate user
-        user = authenticate(username=username, password=password)
-        
-        if not user:
-            return Response({'error': 'Invalid credentials'}, 
-                            status=status.HTTP_401_UNAUTHORIZED)
-        
-        # Check if user is active
-        if not user.is_active:
-            return Response({'error': 'User is disabled'}, 
-                            status=status.HTTP_401_UNAUTHORIZED)
-        
-        # Get or create token
-        token, created = Token.objects.get_or_create(user=user)
-        
-        # Return user data with token
-        serializer = UserSerializer(user)
-        response_data = serializer.data
-        response_data['token'] = token.key
-        
-        return Response(response_data, status=status.HTTP_200_OK)
-    except Exception as e:
-        logger.error(f"Error in user_login: {str(e)}")
-        return Response({"error": str(e)}, 
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        claims = verify_token(request.data.get('refresh_token') or '', REFRESH)
+    except InvalidToken as e:
+        return Response({'error': str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+    
+    try:
+        user = User.objects.get(id=claims['uid'])
+    except User.DoesNotExist:
+        return Response({'error': 'User inactive or deleted'}, status=status.HTTP_401_UNAUTHORIZED)
+    if not user.is_active or not matches_password(user, claims):
+        return Response({'error': 'User inactive or password changed'}, status=status.HTTP_401_UNAUTHORIZED)
+    
+    revoke_token(claims)
+    return Response(issue_tokens(user))
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def revoke_signed_token(request):
+    """Revoke a signed access or refresh token (e.g. on logout)"""
+    token = request.data.get('token') or ''
+    for token_type in (ACCESS, REFRESH):
+        try:
+            claims = verify_token(token, token_type)
+        except InvalidToken:
+            continue
+        revoke_token(claims)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response({'error': 'Invalid token'}, status=status.HTTP_400_BAD_REQUEST)
 
 # Add a debug endpoint to help troubleshoot student creation
 @api_view(['GET'])
@@ -250,8 +595,7 @@ def debug_student_data(request, pk=None):
             serializer = UserSerializer(student)
             return Response({
                 'user_data': serializer.data,
-                'raw_courses_with_grades': student.coursesWithGrades,
-                'courses_with_grades_type': str(type(student.coursesWithGrades))
+                'raw_enrollments': list(student.enrollments.values('id', 'course_id', 'grade', 'updated_at')),
             })
         else:
             return Response({'error': 'Please provide a student ID'}, status=status.HTTP_400_BAD_REQUEST)
@@ -268,30 +612,30 @@ def debug_create_student(request):
     """
     try:
         # Log the incoming data
-        print("Received data:", request.data)
+        logger.debug("Received data: %s", request.data)
         
         # Extract university ID if present
         university_id = request.data.get('university_id') or request.data.get('university')
-        print(f"University ID extracted: {university_id}")
+        logger.debug("University ID extracted: %s", university_id)
         
         # Try to find university
         if university_id:
             try:
                 university = University.objects.get(id=university_id)
-                print(f"Found university: {university}")
+                logger.debug("Found university: %s", university)
             except University.DoesNotExist:
-                print(f"University with ID {university_id} not found")
+                logger.debug("University with ID %s not found", university_id)
         
         # Create user via serializer
         serializer = UserSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            print(f"User created with university: {user.university}")
+            logger.debug("User created with university: %s", user.university)
             return Response(UserSerializer(user).data, status=status.HTTP_201_CREATED)
         else:
-            print("Validation errors:", serializer.errors)
+            logger.debug("Validation errors: %s", serializer.errors)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
-        print(f"Error in debug_create_student: {str(e)}")
+        logger.error(f"Error in debug_create_student: {str(e)}")
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -599,29 +599,20 @@ document.addEventListener('DOMContentLoaded', function() {
                 throw new Error('Student not found');
             }
             
-            // Find the course enrollment
-            const coursesWithGrades = [...(student.coursesWithGrades || [])];
-            const courseIndex = coursesWithGrades.findIndex(c => c.courseId === courseId);
-            
-            if (courseIndex === -1) {
+            // Make sure the student is enrolled before changing the grade
+            if (!(student.coursesWithGrades || []).some(c => c.courseId === courseId)) {
                 throw new Error('Student is not enrolled in this course');
             }
             
-            // Update the grade
-            coursesWithGrades[courseIndex] = {
-                ...coursesWithGrades[courseIndex],
-                grade: grade || 'N/A'
-            };
-            
-            // Make API call to update the student record
-            const response = await fetch(`${USERS_API}${studentId}/`, {
-                method: 'PATCH',
+            // Update just this enrollment on the server
+            const response = await fetch(`${USERS_API}${studentId}/enrollments/${courseId}/`, {
+                method: 'PUT',
                 headers: {
                     'Content-Type': 'application/json',
                     'Authorization': `Token ${token}`
                 },
                 body: JSON.stringify({
-                    coursesWithGrades: coursesWithGrades
+                    grade: grade || 'N/A'
                 })
             });
             
@@ -630,16 +621,18 @@ document.addEventListener('DOMContentLoaded', function() {
                 throw new Error(`Failed to update grade: ${errorData}`);
             }
             
-            // Update local data with response
-            const updatedStudent = await response.json();
+            // Response holds the updated enrollment and the student's new GPA
+            const updatedEnrollment = await response.json();
             
             // Update student in our local array
             const studentIndex = students.findIndex(s => s.id === studentId);
             if (studentIndex !== -1) {
                 students[studentIndex] = {
                     ...students[studentIndex],
-                    coursesWithGrades: updatedStudent.coursesWithGrades || [],
-                    gpa: updatedStudent.gpa || calculateGPA(updatedStudent.coursesWithGrades || [])
+                    coursesWithGrades: (students[studentIndex].coursesWithGrades || []).map(c =>
+                        c.courseId === courseId ? { ...c, grade: updatedEnrollment.grade } : c
+                    ),
+                    gpa: updatedEnrollment.gpa
                 };
             }
             
@@ -668,20 +661,12 @@ document.addEventListener('DOMContentLoaded', function() {
                 throw new Error('Student not found');
             }
             
-            // Filter out the course to unenroll from
-            const updatedCoursesWithGrades = (student.coursesWithGrades || [])
-                .filter(c => c.courseId !== courseId);
-            
-            // Make API call to update the student record
-            const response = await fetch(`${USERS_API}${studentId}/`, {
-                method: 'PATCH',
+            // Remove just this enrollment on the server
+            const response = await fetch(`${USERS_API}${studentId}/enrollments/${courseId}/`, {
+                method: 'DELETE',
                 headers: {
-                    'Content-Type': 'application/json',
                     'Authorization': `Token ${token}`
-                },
-                body: JSON.stringify({
-                    coursesWithGrades: updatedCoursesWithGrades
-                })
+                }
             });
             
             if (!response.ok) {
@@ -689,16 +674,17 @@ document.addEventListener('DOMContentLoaded', function() {
                 throw new Error(`Failed to unenroll student: ${errorData}`);
             }
             
-            // Update local data with response
-            const updatedStudent = await response.json();
+            // Response holds the student's new GPA
+            const result = await response.json();
             
             // Update student in our local array
             const studentIndex = students.findIndex(s => s.id === studentId);
             if (studentIndex !== -1) {
                 students[studentIndex] = {
                     ...students[studentIndex],
-                    coursesWithGrades: updatedStudent.coursesWithGrades || [],
-                    gpa: updatedStudent.gpa || calculateGPA(updatedStudent.coursesWithGrades || [])
+                    coursesWithGrades: (students[studentIndex].coursesWithGrades || [])
+                        .filter(c => c.courseId !== courseId),
+                    gpa: result.gpa
                 };
             }
             
@@ -994,8 +980,8 @@ document.addEventListener('DOMContentLoaded', function() {
                 return [];
             }
             
-            // Fetch all users
-            const users = await fetch(`${API_BASE_URL}users/`, {
+            // Let the server filter down to the university's teachers, sending only the fields used here
+            const users = await fetch(`${API_BASE_URL}users/?role=teacher&university=${encodeURIComponent(universityId)}&fields=id,name,role,university_id`, {
                 headers: {
                     'Content-Type': 'application/json',
                     'Authorization': `Token ${token}`
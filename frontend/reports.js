@@ -100,7 +100,9 @@ document.addEventListener('DOMContentLoaded', function() {
         const response = await fetch(url, {
             headers: {
                 'Authorization': `Token ${token}`,
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                // Lists come back as {columns, rows}: much smaller for large lists
+                'Accept': 'application/vnd.columnar+json, application/json;q=0.9'
             }
         });
         
@@ -108,7 +110,21 @@ document.addEventListener('DOMContentLoaded', function() {
             throw new Error(`API error: ${response.statusText}`);
         }
         
-        return await response.json();
+        return fromColumnar(await response.json());
+    }
+    
+    // Turn a columnar list response back into an array of objects
+    function fromColumnar(data) {
+        if (!data || !Array.isArray(data.columns) || !Array.isArray(data.rows)) {
+            return data;
+        }
+        return data.rows.map(row => {
+            const item = {};
+            data.columns.forEach((column, index) => {
+                item[column] = row[index];
+            });
+            return item;
+        });
     }
     
     // Load course data from API
@@ -133,7 +149,7 @@ document.addEventListener('DOMContentLoaded', function() {
     async function loadStudents() {
         try {
             showLoading();
-            const userData = await fetchFromAPI(USERS_API);
+            const userData = await fetchFromAPI(`${USERS_API}?role=student`);
             // Filter users to get only students
             students = userData.filter(user => user.role === 'student');
             console.log("Students data loaded:", students.length, "students");
@@ -351,28 +367,16 @@ document.addEventListener('DOMContentLoaded', function() {
                         try {
                             showLoading();
                             
-                            // Update student's coursesWithGrades
-                            let updatedCoursesWithGrades = [...(student.coursesWithGrades || [])];
-                            const existingCourseIndex = updatedCoursesWithGrades.findIndex(c => c.courseId === courseId);
-                            
-                            if (existingCourseIndex >= 0) {
-                                // Update existing course grade
-                                updatedCoursesWithGrades[existingCourseIndex].grade = newGrade;
-                            } else {
-                                // Add new course with grade
-                                updatedCoursesWithGrades.push({ courseId: courseId, grade: newGrade });
-                            }
-                            
-                            // Send update to backend
+                            // Send just this enrollment to the backend
                             const token = getAuthToken();
-                            const response = await fetch(`${USERS_API}${student.id}/`, {
-                                method: 'PATCH',
+                            const response = await fetch(`${USERS_API}${student.id}/enrollments/${courseId}/`, {
+                                method: 'PUT',
                                 headers: {
                                     'Authorization': `Token ${token}`,
                                     'Content-Type': 'application/json'
                                 },
                                 body: JSON.stringify({
-                                    coursesWithGrades: updatedCoursesWithGrades
+                                    grade: newGrade
                                 })
                             });
                             
@@ -381,11 +385,18 @@ document.addEventListener('DOMContentLoaded', function() {
                             }
                             
                             // Update local student object
-                            const updatedStudent = await response.json();
-                            console.log("Grade updated successfully:", updatedStudent);
+                            const updatedEnrollment = await response.json();
+                            console.log("Grade updated successfully:", updatedEnrollment);
                             const studentIndex = students.findIndex(s => s.id === student.id);
                             if (studentIndex >= 0) {
-                                students[studentIndex] = updatedStudent;
+                                const coursesWithGrades = (students[studentIndex].coursesWithGrades || [])
+                                    .filter(c => c.courseId !== courseId);
+                                coursesWithGrades.push({ courseId: courseId, grade: updatedEnrollment.grade });
+                                students[studentIndex] = {
+                                    ...students[studentIndex],
+                                    coursesWithGrades: coursesWithGrades,
+                                    gpa: updatedEnrollment.gpa
+                                };
                             }
                             
                             // Update the grade badge
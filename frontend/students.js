@@ -8,6 +8,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const USERS_API = `${API_BASE_URL}/users/`;
     const STUDENTS_API = `${API_BASE_URL}/users/?role=student`;
     const UNIVERSITIES_API = `${API_BASE_URL}/universities/`;
+    const BOOTSTRAP_API = `${API_BASE_URL}/bootstrap/?include=courses`;
     
     // Authentication token storage
     let authToken = localStorage.getItem('authToken');
@@ -66,19 +67,7 @@ document.addEventListener('DOMContentLoaded', function() {
             const data = await response.json();
             console.log("Courses fetched from API:", data);
             
-            // Normalize API data to match our expected format if needed
-            courses = data.map(course => ({
-                id: course.id,
-                name: course.name,
-                credits: course.credits,
-                professor: course.professor || 'Not assigned',
-                type: course.type || 'mandatory',
-                description: course.description || '',
-                university_id: course.university_id || null // Add university_id to course data
-            }));
-            
-            // Display courses once they're loaded
-            displayCourses(courses);
+            setCourses(data);
             
             hideLoadingIndicator();
             return courses;
@@ -90,6 +79,54 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
+    // Normalize API course data to match our expected format and display it
+    function setCourses(data) {
+        courses = data.map(course => ({
+            id: course.id,
+            name: course.name,
+            credits: course.credits,
+            professor: course.professor || 'Not assigned',
+            type: course.type || 'mandatory',
+            description: course.description || '',
+            university_id: course.university_id || null // Add university_id to course data
+        }));
+        
+        // Display courses once they're loaded
+        displayCourses(courses);
+    }
+    
+    // Fetch universities and courses in a single request.
+    // Returns false if the bootstrap endpoint couldn't be used.
+    async function fetchBootstrap() {
+        try {
+            const headers = {
+                'Content-Type': 'application/json'
+            };
+            
+            if (authToken) {
+                headers['Authorization'] = `Token ${authToken}`;
+            }
+            
+            const response = await fetch(BOOTSTRAP_API, {
+                method: 'GET',
+                headers: headers
+            });
+            
+            if (!response.ok) {
+                return false;
+            }
+            
+            const data = await response.json();
+            console.log("Bootstrap data fetched:", data);
+            universities = data.universities;
+            setCourses(data.courses);
+            return true;
+        } catch (error) {
+            console.error("Error fetching bootstrap data:", error);
+            return false;
+        }
+    }
+    
     // Fetch students from backend API
     async function fetchStudents() {
         try {
@@ -785,11 +822,14 @@ document.addEventListener('DOMContentLoaded', function() {
     // Initial display - fetch courses and then students
     async function initializeApp() {
         try {
-            // First fetch universities
-            await fetchUniversities();
+            // Universities and courses come from one bootstrap request;
+            // fall back to separate requests if it isn't available
+            if (!await fetchBootstrap()) {
+                await fetchUniversities();
+                await fetchCourses();
+            }
             
-            // Then fetch courses and students
-            await fetchCourses();
+            // Student cards need the universities and courses above
             await fetchStudents();
         } catch (error) {
             console.error('Error initializing app:', error);